@@ -1341,20 +1341,20 @@ class DarkScanGUI:
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         self.history_listbox.config(yscrollcommand=scrollbar.set)
         
-        # 加载历史记录
+        # 加载历史记录(scandir目录项自带stat，每个文件只取一次，创建时间和大小都从中读取)
         files = []
-        for fname in os.listdir(SCAN_RESULTS_DIR):
-            if fname.endswith(".csv"):
-                fpath = os.path.join(SCAN_RESULTS_DIR, fname)
-                ftime = os.path.getctime(fpath)
-                files.append((-ftime, fname, fpath))
+        with os.scandir(SCAN_RESULTS_DIR) as entries:
+            for entry in entries:
+                if entry.name.endswith(".csv"):
+                    st = entry.stat()
+                    files.append((-st.st_ctime, entry.name, entry.path, st.st_size))
         
         files.sort()
         
         self.history_files = []
-        for _, fname, fpath in files[:20]:  # 只显示最近20条
-            fsize = os.path.getsize(fpath) / 1024
-            fdate = datetime.fromtimestamp(os.path.getctime(fpath)).strftime('%Y-%m-%d %H:%M')
+        for neg_ctime, fname, fpath, size in files[:20]:  # 只显示最近20条
+            fsize = size / 1024
+            fdate = datetime.fromtimestamp(-neg_ctime).strftime('%Y-%m-%d %H:%M')
             self.history_listbox.insert(tk.END, f"{fname} ({fsize:.1f}KB) - {fdate}")
             self.history_files.append(fpath)
         
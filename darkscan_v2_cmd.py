@@ -5,18 +5,32 @@ import json
 import re
 import threading
 import signal
-import shutil
 import subprocess
 import time
 import socket
-from difflib import Differ, SequenceMatcher
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import queue
+import heapq
+import tempfile
+import hashlib
+import uuid
+import gzip
+import sqlite3
+import importlib.util
+import multiprocessing
+from collections import Counter
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, BrokenExecutor, as_completed, wait, FIRST_COMPLETED
 from datetime import datetime
-from urllib.parse import urlparse, urljoin
+from urllib.parse import urlparse, urljoin, urldefrag
+
+# 预处理进程池以spawn方式启动子进程，子进程会重新导入本脚本；
+# 子进程中跳过替换stdout、检查安装依赖、启动日志线程这些导入时的副作用
+IS_MAIN_PROCESS = multiprocessing.parent_process() is None
 
 # 确保中文显示正常
 import io
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+if IS_MAIN_PROCESS:
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
 # 终端颜色代码，用于美化输出
 class Color:
@@ -35,14 +49,14 @@ def install_missing_dependencies():
     required_packages = {
         "requests": "requests",
         "bs4": "beautifulsoup4",
+        "lxml": "lxml",
         "schedule": "schedule"
     }
     
+    # 只检查包是否存在，不实际导入，真正的导入推迟到首次使用时
     missing = []
     for import_name, package_name in required_packages.items():
-        try:
-            __import__(import_name)
-        except ImportError:
+        if importlib.util.find_spec(import_name) is None:
             missing.append(package_name)
     
     if missing:
@@ -64,12 +78,67 @@ def install_missing_dependencies():
             sys.exit(1)
 
 # 先检查并安装依赖
-install_missing_dependencies()
+if IS_MAIN_PROCESS:
+    install_missing_dependencies()
+
+# 现在导入需要的库（requests、bs4、schedule在首次使用时再导入，加快启动）
+from lxml import etree
+
+# 多关键词匹配：安装了pyahocorasick时用Aho-Corasick自动机一次扫描，否则逐个子串查找
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# 正则规则集：安装了google-re2时用RE2::Set一次线性扫描找出所有命中的规则，否则只用标准库re
+try:
+    import re2
+    if not hasattr(re2, "Set"):
+        re2 = None
+except ImportError:
+    re2 = None
+
+# 基准内容压缩：安装了zstandard时用zstd(压缩率更高、解压更快)，否则用标准库gzip
+# 读取时按帧头魔数区分，两种格式的旧数据可以混用
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
 
-# 现在导入需要的库
-import requests
-from bs4 import BeautifulSoup
-import schedule
+def compress_text(text):
+    """压缩文本为字节串（zstd或gzip）"""
+    data = text.encode('utf-8')
+    if zstandard is not None:
+        return zstandard.compress(data, 3)
+    return gzip.compress(data)
+
+def decompress_text(blob):
+    """解压compress_text生成的字节串，自动识别zstd/gzip"""
+    if blob[:4] == ZSTD_MAGIC:
+        if zstandard is None:
+            raise RuntimeError("基准内容为zstd压缩，请先安装zstandard: pip install zstandard")
+        return zstandard.decompress(blob).decode('utf-8')
+    return gzip.decompress(blob).decode('utf-8')
+
+# JSON读写：安装了orjson时使用orjson加速，否则回退到标准库json（均为UTF-8字节）
+try:
+    import orjson
+
+    def json_loads(data):
+        return orjson.loads(data)
+
+    def json_dumps_bytes(obj):
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+except ImportError:
+    orjson = None
+
+    def json_loads(data):
+        return json.loads(data)
+
+    def json_dumps_bytes(obj):
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode('utf-8')
 
 # 获取脚本所在目录
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -82,22 +151,192 @@ SCAN_RESULTS_DIR = os.path.join(SCRIPT_DIR, "scan_results")
 BASE_CONTENTS_DIR = os.path.join(SCRIPT_DIR, "base_contents")
 TAMPER_RESULTS_DIR = os.path.join(SCRIPT_DIR, "tamper_results")
 
-# 全局状态跟踪与锁
+class ThreadShards:
+    """按线程分片的数据基类，每个线程只写自己的分片，热路径无需加锁；shard_factory用于创建新分片"""
+    def __init__(self, shard_factory):
+        self._new_shard = shard_factory
+        self._local = threading.local()
+        self._lock = threading.Lock()  # 仅在线程首次写入和重置时使用
+        self._generation = 0
+        self._shards = []
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None or self._local.generation != self._generation:
+            with self._lock:
+                shard = self._new_shard()
+                self._shards.append(shard)
+                self._local.generation = self._generation
+            self._local.shard = shard
+        return shard
+
+    def reset(self):
+        """清空所有分片，新一轮扫描开始时调用"""
+        with self._lock:
+            self._generation += 1
+            self._shards = []
+
+class ShardedCounter(ThreadShards):
+    """分片计数器：自增只修改当前线程的分片，读取时汇总"""
+    def __init__(self):
+        super().__init__(lambda: [0])
+
+    def add(self, n=1):
+        self._shard()[0] += n
+
+    def value(self):
+        return sum(shard[0] for shard in list(self._shards))
+
+class ShardedList(ThreadShards):
+    """分片结果列表：各线程追加到自己的列表，仅在汇报/保存时合并"""
+    def __init__(self):
+        super().__init__(list)
+
+    def append(self, item):
+        self._shard().append(item)
+
+    def extend(self, items):
+        self._shard().extend(items)
+
+    def merged(self):
+        merged = []
+        for shard in list(self._shards):
+            merged.extend(shard)
+        return merged
+
+# 全局状态跟踪：计数和结果按线程分片；其余字段只做整体赋值(GIL下原子)，读取走status_snapshot，均不需要锁
 global_state = {
-    "is_terminated": False,
     "current_url": None,
-    "processed_urls": 0,
+    "processed_urls": ShardedCounter(),
     "total_urls": 0,
-    "results": [],
-    "tamper_results": [],
+    "results": ShardedList(),
+    "result_stream": None,  # 批量扫描时边扫描边写入的结果文件(ResultCsvStream)，为None时结果暂存在results中
+    "tamper_results": ShardedList(),
+    "malicious_count": ShardedCounter(),  # 随结果一起累加，进度显示直接读计数，不必遍历结果
+    "tamper_count": ShardedCounter(),
+    "checked_child_urls": set(),  # 本轮篡改检测已检测过的子链接(规范化URL)，不同父链接共用的子链接只检测一次
+    "scanned_urls": set(),  # 本轮批量扫描已提交过的链接(规范化URL)，不同父链接共用的子链接只获取和分析一次
     "start_time": None,
-    "active_threads": 0,
+    "active_threads": ShardedCounter(),
     "save_lock": threading.Lock()  # 用于文件保存的锁
 }
-state_lock = threading.Lock()  # 状态锁定义
+checked_child_urls_lock = threading.Lock()
+scanned_urls_lock = threading.Lock()
+stop_event = threading.Event()  # 终止标志，收到终止信号或扫描出错时置位，工作线程无锁轮询
+progress_event = threading.Event()  # 有URL处理完或收到终止信号时置位，唤醒进度显示线程
+
+def mark_url_processed():
+    """已处理URL数加一，并唤醒进度显示线程"""
+    global_state["processed_urls"].add()
+    progress_event.set()
+
+def request_stop():
+    """置位终止标志，并唤醒进度显示线程"""
+    stop_event.set()
+    progress_event.set()
+
+def record_scan_results(results):
+    """记录链接扫描结果，同时累加可疑链接计数"""
+    stream = global_state["result_stream"]
+    if stream is not None:
+        if results:
+            stream.put(results)
+    else:
+        global_state["results"].extend(results)
+    malicious = sum(1 for result in results if result["is_malicious"])
+    if malicious:
+        global_state["malicious_count"].add(malicious)
+
+def record_tamper_results(results):
+    """记录篡改检测结果，同时累加篡改计数"""
+    global_state["tamper_results"].extend(results)
+    tampered = sum(1 for result in results if result["is_tampered"])
+    if tampered:
+        global_state["tamper_count"].add(tampered)
+
+# 扫描状态只读快照: (总URL数, 已处理数, 活跃线程数, 当前URL, 开始时间)
+# 整体替换元组发布(赋值在GIL下是原子的)，读取方无需加锁
+status_snapshot = (0, 0, 0, None, None)
+
+def publish_status_snapshot():
+    """生成并发布当前扫描状态快照"""
+    global status_snapshot
+    status_snapshot = (
+        global_state["total_urls"],
+        global_state["processed_urls"].value(),
+        global_state["active_threads"].value(),
+        global_state["current_url"],
+        global_state["start_time"]
+    )
+    return status_snapshot
+
+# 日志队列：工作线程只负责入队，由后台线程批量写到终端，避免工作线程阻塞在终端I/O上
+log_queue = queue.Queue(maxsize=8192)
+
+# 请求头，模块级定义避免每次请求重复构建
+REQUEST_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36"
+}
 
-# 线程安全的日志锁
-log_lock = threading.Lock()
+# 全局共享的HTTP会话，复用TCP/TLS连接(keep-alive)，避免每次请求重新握手
+# 首次发请求时才导入requests并创建，见get_http_session
+http_session = None
+http_session_lock = threading.Lock()
+# 每个主机的连接池大小，按线程数由init_probe_pool调整，与最大并发请求数一致
+http_pool_maxsize = 100
+
+def mount_http_adapters(session):
+    """按当前连接池大小给会话挂载http/https适配器"""
+    from requests.adapters import HTTPAdapter
+    # 连接池与并发数一致，避免多线程并发时连接被丢弃；重试由get_page_content自行处理
+    adapter = HTTPAdapter(pool_connections=100, pool_maxsize=http_pool_maxsize, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+def get_http_session():
+    """获取(首次使用时创建)共享HTTP会话"""
+    global http_session
+    if http_session is None:
+        with http_session_lock:
+            if http_session is None:
+                import requests
+                session = requests.Session()
+                session.headers.update(REQUEST_HEADERS)
+                mount_http_adapters(session)
+                http_session = session
+    return http_session
+
+# 协议探活共享线程池(http/https并行探测)，避免每个URL都新建线程池
+probe_pool = None
+# 子链接分析共享线程池：所有父链接的子链接任务都提交到这里，空闲线程可以分担链接多的父链接
+link_pool = None
+# 每个扫描线程平均分到的链接分析线程数
+LINK_THREADS_PER_URL = 5
+
+def init_probe_pool(threads):
+    """按线程数初始化(或重建)协议探活线程池和子链接分析线程池"""
+    global probe_pool, link_pool, http_pool_maxsize
+    old_pools = (probe_pool, link_pool)
+    # 链接分析线程 × http/https两个探测
+    probe_pool = ThreadPoolExecutor(max_workers=threads * LINK_THREADS_PER_URL * 2, thread_name_prefix="probe")
+    link_pool = ThreadPoolExecutor(max_workers=threads * LINK_THREADS_PER_URL, thread_name_prefix="link")
+    for old_pool in old_pools:
+        if old_pool:
+            old_pool.shutdown(wait=False)
+    # 同一主机最多可能有threads*10个并发请求，连接池至少要容纳这么多
+    http_pool_maxsize = max(100, threads * 10)
+    with http_session_lock:
+        if http_session is not None:
+            mount_http_adapters(http_session)
+    return probe_pool
+
+# 基准内容库(SQLite，位于BASE_CONTENTS_DIR下)，首次使用时打开，所有线程共用一个连接
+BASE_DB_NAME = "base.db"
+base_db = None
+base_db_lock = threading.Lock()
+# 基准内容批量提交：每写入BASE_DB_COMMIT_BATCH条提交一次事务，其余在初始化结束/关闭库时提交
+BASE_DB_COMMIT_BATCH = 64
+base_db_uncommitted = 0
 
 def print_darkscan_banner():
     """打印DarkScan图案和作者信息"""
@@ -155,39 +394,52 @@ def print_main_menu():
 
 def handle_termination(signum, frame):
     """处理强制终止信号（兼容Windows和Unix系统）"""
-    # 双重检查终止状态，避免重复处理
-    with state_lock:
-        if global_state["is_terminated"]:
-            print(f"\n{Color.RED}再次收到终止信号，强制退出...{Color.RESET}")
-            os._exit(1)
-            
-        # 根据系统显示不同的终止提示
-        if sys.platform.startswith('win32'):
-            print(f"\n{Color.BOLD}{'='*60}{Color.RESET}")
-            print(f"{Color.YELLOW}[!] 收到终止信号 (Ctrl+C)，正在保存当前状态...{Color.RESET}")
-        else:
-            print(f"\n{Color.BOLD}{'='*60}{Color.RESET}")
-            print(f"{Color.YELLOW}[!] 收到终止信号 (Ctrl+Z)，正在保存当前状态...{Color.RESET}")
-            
-        global_state["is_terminated"] = True
-    
-    # 输出当前分析状态
-    with state_lock:
-        elapsed_time = datetime.now() - global_state["start_time"] if global_state["start_time"] else 0
-        print(f"\n{Color.CYAN}当前分析状态:{Color.RESET}")
-        print(f"总URL数: {global_state['total_urls']}")
-        print(f"已处理: {global_state['processed_urls']}/{global_state['total_urls']}")
-        print(f"当前处理: {global_state['current_url'] or '无'}")
-        print(f"活跃线程: {global_state['active_threads']}")
-        print(f"已分析链接数: {len(global_state['results'])}")
-        print(f"检测到篡改数: {len(global_state['tamper_results'])}")
-        print(f"运行时间: {str(elapsed_time)}")
+    # 再次收到终止信号时直接强制退出
+    if stop_event.is_set():
+        print(f"\n{Color.RED}再次收到终止信号，强制退出...{Color.RESET}")
+        os._exit(1)
+    # 先置位终止标志，工作线程在下一个检查点即停止
+    request_stop()
+    
+    # 根据系统显示不同的终止提示
+    if sys.platform.startswith('win32'):
+        print(f"\n{Color.BOLD}{'='*60}{Color.RESET}")
+        print(f"{Color.YELLOW}[!] 收到终止信号 (Ctrl+C)，正在保存当前状态...{Color.RESET}")
+    else:
+        print(f"\n{Color.BOLD}{'='*60}{Color.RESET}")
+        print(f"{Color.YELLOW}[!] 收到终止信号 (Ctrl+Z)，正在保存当前状态...{Color.RESET}")
+    
+    # 写完流式结果文件队列中剩余的结果并关闭文件，再汇总各线程分片的结果
+    stream = global_state["result_stream"]
+    global_state["result_stream"] = None
+    streamed_count = stream.close() if stream else 0
+    results = global_state["results"].merged()
+    tamper_results = global_state["tamper_results"].merged()
+    flush_logs()
+    # 提交已写入的基准内容(初始化基准时被中断也不丢失)；库锁被占用时最多等待5秒
+    try:
+        commit_base_db(timeout=5)
+    except Exception as e:
+        print(f"{Color.RED}[!] 提交基准内容失败: {str(e)}{Color.RESET}")
+    
+    # 输出当前分析状态（生成无锁快照，不与工作线程争锁）
+    total_urls, processed, active_threads, current_url, start_time = publish_status_snapshot()
+    elapsed_time = datetime.now() - start_time if start_time else 0
+    print(f"\n{Color.CYAN}当前分析状态:{Color.RESET}")
+    print(f"总URL数: {total_urls}")
+    print(f"已处理: {processed}/{total_urls}")
+    print(f"当前处理: {current_url or '无'}")
+    print(f"活跃线程: {active_threads}")
+    print(f"已分析链接数: {streamed_count + len(results)}")
+    print(f"检测到篡改数: {len(tamper_results)}")
+    print(f"运行时间: {str(elapsed_time)}")
     
     # 保存当前结果 - 无论结果如何都保存
-    save_path = None
+    save_path = stream.file_path if stream else None
     try:
-        with global_state["save_lock"]:
-            save_path = save_scan_results(global_state["results"], "interrupted_scan")
+        if stream is None:
+            with global_state["save_lock"]:
+                save_path = save_scan_results(results, "interrupted_scan")
         if save_path:
             print(f"\n{Color.GREEN}[!] 扫描结果已保存至: {save_path}{Color.RESET}")
         else:
@@ -199,7 +451,7 @@ def handle_termination(signum, frame):
     tamper_save_path = None
     try:
         with global_state["save_lock"]:
-            tamper_save_path = save_tamper_results(global_state["tamper_results"], "interrupted_tamper")
+            tamper_save_path = save_tamper_results(tamper_results, "interrupted_tamper")
         if tamper_save_path:
             print(f"\n{Color.GREEN}[!] 篡改检测结果已保存至: {tamper_save_path}{Color.RESET}")
         else:
@@ -207,29 +459,35 @@ def handle_termination(signum, frame):
     except Exception as e:
         print(f"\n{Color.RED}[!] 保存篡改检测结果时发生错误: {str(e)}{Color.RESET}")
     
-    if not global_state["results"] and not global_state["tamper_results"]:
+    if not streamed_count and not results and not tamper_results:
         print(f"\n{Color.YELLOW}[!] 暂无结果可保存{Color.RESET}")
     
     print(f"\n{Color.GREEN}程序已安全终止{Color.RESET}")
     os._exit(0)
 
+# 已确认存在且可写的目录，避免每次保存都重复检查
+verified_dirs = set()
+
 def ensure_directory_exists(file_path):
     """确保文件所在目录存在，如果不存在则创建"""
     try:
         directory = os.path.dirname(file_path)
+        if directory in verified_dirs:
+            return True
         if not os.path.exists(directory):
             os.makedirs(directory, exist_ok=True)
             print(f"{Color.CYAN}已创建目录: {directory}{Color.RESET}")
         # 检查目录是否可写
         if not os.access(directory, os.W_OK):
             raise PermissionError(f"没有写入权限: {directory}")
+        verified_dirs.add(directory)
         return True
     except Exception as e:
         print(f"{Color.RED}确保目录存在失败: {str(e)}{Color.RESET}")
         return False
 
 def get_unique_filename(base_dir, base_name, extension):
-    """生成唯一的文件名，若存在同名文件则添加计数器"""
+    """生成唯一的文件名(时间戳 + 随机后缀)"""
     try:
         # 确保基础目录存在
         if not ensure_directory_exists(os.path.join(base_dir, "test.tmp")):
@@ -241,25 +499,145 @@ def get_unique_filename(base_dir, base_name, extension):
         if base_name.endswith(f".{extension}"):
             base_name = base_name[:-len(f".{extension}")]
     
+        # 随机后缀保证同一秒内多次保存也不会重名，无需逐个探测已有文件
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"{base_name}_{timestamp}.{extension}"
-        file_path = os.path.join(base_dir, filename)
-        
-        counter = 1
-        while os.path.exists(file_path):
-            filename = f"{base_name}_{timestamp}_{counter}.{extension}"
-            file_path = os.path.join(base_dir, filename)
-            counter += 1
-            if counter > 1000:
-                raise Exception("无法生成唯一的文件名，已尝试1000次")
-        
-        return file_path
+        return os.path.join(base_dir, f"{base_name}_{timestamp}_{uuid.uuid4().hex[:6]}.{extension}")
     except Exception as e:
         print(f"{Color.RED}生成唯一文件名失败: {str(e)}{Color.RESET}")
         # 最后的备选方案：使用当前目录和进程ID生成文件名
         emergency_filename = f"darkscan_{os.getpid()}_{int(time.time())}.{extension}"
         return os.path.join(os.getcwd(), emergency_filename)
 
+# CSV字段映射表: (CSV列名, 结果字典键, 格式化函数)，格式化函数为None时直接取值
+def _yes_no(value):
+    return "是" if value else "否"
+
+def _join_comma(value):
+    return ", ".join(value or [])
+
+def _join_lines(value):
+    return "\n".join(value or [])
+
+def _fixed2(value):
+    return f"{value or 0:.2f}"
+
+SCAN_CSV_FIELDS = (
+    ("检测时间", "timestamp", None),
+    ("父级URL", "parent_url", None),
+    ("原始URL", "original_url", None),
+    ("HTTP状态", "http_status", None),
+    ("HTTPS状态", "https_status", None),
+    ("有效URL", "effective_url", None),
+    ("链接类型", "link_type", None),
+    ("原始链接", "original_link", None),
+    ("绝对链接", "absolute_link", None),
+    ("HTTP状态码", "status_code", None),
+    ("递归深度", "depth", None),
+    ("URL规则匹配项", "url_matches", _join_comma),
+    ("内容规则匹配项", "content_matches", _join_comma),
+    ("标签文本内容", "tag_content", None),
+    ("是否匹配URL规则", "is_rule_match", _yes_no),
+    ("是否匹配内容规则", "is_content_match", _yes_no),
+    ("是否恶意", "is_malicious", _yes_no),
+    ("威胁情报详情", "threat_info", _join_lines),
+    ("IP地址", "ip_addresses", _join_comma),
+    ("IP属地(国家)", "ip_country", None),
+    ("IP属地(地区)", "ip_region", None),
+    ("IP属地(城市)", "ip_city", None),
+    ("IP服务商", "ip_isp", None)
+)
+
+TAMPER_CSV_FIELDS = (
+    ("检测时间", "timestamp", None),
+    ("原始URL", "original_url", None),
+    ("HTTP状态", "http_status", None),
+    ("HTTPS状态", "https_status", None),
+    ("有效URL", "effective_url", None),
+    ("URL", "url", None),
+    ("链接类型", "link_type", lambda value: "父链接" if value is None else value),
+    ("基准内容时间", "base_content_time", None),
+    ("内容相似度", "similarity", _fixed2),
+    ("差异大小", "diff_size", lambda value: 0 if value is None else value),
+    ("差异比例(%)", "diff_percentage", _fixed2),
+    ("是否判定为篡改", "is_tampered", _yes_no),
+    ("篡改类型", "tamper_type", None),
+    ("主要差异描述", "diff_description", None),
+    ("IP地址", "ip_addresses", _join_comma),
+    ("IP属地(国家)", "ip_country", None),
+    ("IP属地(地区)", "ip_region", None),
+    ("IP属地(城市)", "ip_city", None),
+    ("IP服务商", "ip_isp", None)
+)
+
+# CSV表头，按映射表预先生成
+SCAN_CSV_FIELDNAMES = [field for field, _, _ in SCAN_CSV_FIELDS]
+TAMPER_CSV_FIELDNAMES = [field for field, _, _ in TAMPER_CSV_FIELDS]
+
+# CSV中需要去除的特殊字符(\0、\r)
+CSV_STRIP_TABLE = str.maketrans('', '', '\0\r')
+
+def _csv_cell(value):
+    return value.translate(CSV_STRIP_TABLE) if isinstance(value, str) else value
+
+def build_csv_rows(results, fields):
+    """按字段映射表把结果转换为CSV行(元组，列顺序与表头一致)，并去除可能导致问题的字符"""
+    return [
+        tuple(_csv_cell(formatter(result.get(key)) if formatter else result.get(key, ""))
+              for _, key, formatter in fields)
+        for result in results
+    ]
+
+class ResultCsvStream:
+    """结果文件流式写入：工作线程把结果批次放入有界队列，由一个后台线程格式化并写入CSV，内存中不保留结果"""
+    def __init__(self, file_path, fields):
+        self.file_path = file_path
+        self.fields = fields
+        self.count = 0
+        self.closed = False
+        self.queue = queue.Queue(maxsize=1000)
+        self.file = open(file_path, 'w', buffering=1 << 20, newline='', encoding='utf-8-sig')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow([field for field, _, _ in fields])
+        self.thread = threading.Thread(target=self._run, daemon=True, name="result-writer")
+        self.thread.start()
+    
+    def _run(self):
+        while True:
+            batch = self.queue.get()
+            if batch is None:
+                break
+            try:
+                self.writer.writerows(build_csv_rows(batch, self.fields))
+                self.count += len(batch)
+            except Exception as e:
+                print(f"{Color.RED}写入结果文件失败: {str(e)}{Color.RESET}")
+    
+    def put(self, results):
+        self.queue.put(results)
+    
+    def close(self):
+        """写完队列中剩余的结果并关闭文件，返回写入的记录数"""
+        if not self.closed:
+            self.closed = True
+            self.queue.put(None)
+            self.thread.join()
+            try:
+                self.file.close()
+            except Exception as e:
+                print(f"{Color.RED}关闭结果文件失败: {str(e)}{Color.RESET}")
+        return self.count
+
+def open_result_stream(base_dir, base_filename, fields):
+    """创建流式写入的结果文件，失败时返回None(调用方退回到结束后一次性保存)"""
+    try:
+        file_path = get_unique_filename(base_dir, base_filename, "csv")
+        if not ensure_directory_exists(file_path):
+            return None
+        return ResultCsvStream(file_path, fields)
+    except Exception as e:
+        print(f"{Color.YELLOW}无法创建结果文件，扫描结束后再统一保存: {str(e)}{Color.RESET}")
+        return None
+
 def save_scan_results(results, base_filename="scan_results"):
     """保存扫描结果为CSV文件，增强错误处理和兼容性，确保无论结果如何都保存"""
     try:
@@ -273,109 +651,21 @@ def save_scan_results(results, base_filename="scan_results"):
             if not ensure_directory_exists(file_path):
                 raise Exception("所有尝试的目录都不可写")
         
-        fieldnames = [
-            "检测时间", "父级URL", "原始URL", "HTTP状态", "HTTPS状态", 
-            "有效URL", "链接类型", "原始链接", "绝对链接", "HTTP状态码", 
-            "递归深度", "URL规则匹配项", "内容规则匹配项", "标签文本内容", 
-            "是否匹配URL规则", "是否匹配内容规则", "是否恶意", "威胁情报详情",
-            "IP地址", "IP属地(国家)", "IP属地(地区)", "IP属地(城市)", "IP服务商"
-        ]
+        fieldnames = SCAN_CSV_FIELDNAMES
         
-        # 使用临时文件先写入，完成后再重命名，确保文件完整性
-        temp_file = f"{file_path}.tmp"
+        # 直接写入目标文件(大缓冲区，关闭时一次落盘)
         try:
-            with open(temp_file, 'w', newline='', encoding='utf-8-sig') as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                writer.writeheader()
-                
-                for result in results:
-                    row_data = {}
-                    for field in fieldnames:
-                        if field == "检测时间":
-                            row_data[field] = result.get("timestamp", "")
-                        elif field == "父级URL":
-                            row_data[field] = result.get("parent_url", "")
-                        elif field == "原始URL":
-                            row_data[field] = result.get("original_url", "")
-                        elif field == "HTTP状态":
-                            row_data[field] = result.get("http_status", "")
-                        elif field == "HTTPS状态":
-                            row_data[field] = result.get("https_status", "")
-                        elif field == "有效URL":
-                            row_data[field] = result.get("effective_url", "")
-                        elif field == "链接类型":
-                            row_data[field] = result.get("link_type", "")
-                        elif field == "原始链接":
-                            row_data[field] = result.get("original_link", "")
-                        elif field == "绝对链接":
-                            row_data[field] = result.get("absolute_link", "")
-                        elif field == "HTTP状态码":
-                            row_data[field] = result.get("status_code", "")
-                        elif field == "递归深度":
-                            row_data[field] = result.get("depth", "")
-                        elif field == "URL规则匹配项":
-                            row_data[field] = ", ".join(result.get("url_matches", []))
-                        elif field == "内容规则匹配项":
-                            row_data[field] = ", ".join(result.get("content_matches", []))
-                        elif field == "标签文本内容":
-                            row_data[field] = result.get("tag_content", "")
-                        elif field == "是否匹配URL规则":
-                            row_data[field] = "是" if result.get("is_rule_match", False) else "否"
-                        elif field == "是否匹配内容规则":
-                            row_data[field] = "是" if result.get("is_content_match", False) else "否"
-                        elif field == "是否恶意":
-                            row_data[field] = "是" if result.get("is_malicious", False) else "否"
-                        elif field == "威胁情报详情":
-                            row_data[field] = "\n".join(result.get("threat_info", []))
-                        elif field == "IP地址":
-                            row_data[field] = ", ".join(result.get("ip_addresses", []))
-                        elif field == "IP属地(国家)":
-                            row_data[field] = result.get("ip_country", "")
-                        elif field == "IP属地(地区)":
-                            row_data[field] = result.get("ip_region", "")
-                        elif field == "IP属地(城市)":
-                            row_data[field] = result.get("ip_city", "")
-                        elif field == "IP服务商":
-                            row_data[field] = result.get("ip_isp", "")
-                        else:
-                            row_data[field] = ""
-                    
-                    # 处理可能的特殊字符
-                    for key, value in row_data.items():
-                        if isinstance(value, str):
-                            # 替换可能导致问题的字符
-                            row_data[key] = value.replace('\0', '').replace('\r', '')
-                    
-                    writer.writerow(row_data)
-            
-            # 验证临时文件是否创建成功
-            if not os.path.exists(temp_file) or os.path.getsize(temp_file) == 0:
-                # 即使没有数据，也要创建包含表头的文件
-                with open(temp_file, 'w', newline='', encoding='utf-8-sig') as csvfile:
-                    writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                    writer.writeheader()
-            
-            # 确保目标文件不存在
-            if os.path.exists(file_path):
-                try:
-                    os.remove(file_path)
-                except Exception as e:
-                    print(f"{Color.YELLOW}删除已有文件失败: {str(e)}，尝试重命名替代{Color.RESET}")
-                    file_path = f"{file_path}.backup"
-            
-            # 重命名临时文件为目标文件
-            os.rename(temp_file, file_path)
+            with open(file_path, 'w', buffering=1 << 20, newline='', encoding='utf-8-sig') as csvfile:
+                writer = csv.writer(csvfile)
+                writer.writerow(fieldnames)
+                writer.writerows(build_csv_rows(results, SCAN_CSV_FIELDS))
             
-            # 验证文件是否保存成功
-            if os.path.exists(file_path) and os.path.getsize(file_path) > 0:
-                print(f"{Color.GREEN}扫描结果保存成功，文件大小: {os.path.getsize(file_path)} bytes{Color.RESET}")
-                return file_path
-            else:
-                raise Exception("文件重命名后验证失败")
+            print(f"{Color.GREEN}扫描结果保存成功，共 {len(results)} 条记录{Color.RESET}")
+            return file_path
                 
         except Exception as e:
-            print(f"{Color.RED}写入临时文件失败: {str(e)}{Color.RESET}")
-            # 尝试直接写入目标文件作为备选方案
+            print(f"{Color.RED}写入结果文件失败: {str(e)}{Color.RESET}")
+            # 备选方案 - 至少保存表头
             try:
                 with open(file_path, 'w', newline='', encoding='utf-8-sig') as csvfile:
                     writer = csv.writer(csvfile)
@@ -383,13 +673,6 @@ def save_scan_results(results, base_filename="scan_results"):
             except Exception as e2:
                 print(f"{Color.RED}应急写入也失败: {str(e2)}{Color.RESET}")
                 return None
-        finally:
-            # 清理临时文件
-            if os.path.exists(temp_file):
-                try:
-                    os.remove(temp_file)
-                except:
-                    pass
         
     except Exception as e:
         print(f"{Color.RED}保存扫描结果失败: {str(e)}{Color.RESET}")
@@ -417,74 +700,20 @@ def save_tamper_results(results, base_filename="tamper_results"):
             if not ensure_directory_exists(file_path):
                 raise Exception("所有尝试的目录都不可写")
         
-        fieldnames = [
-            "检测时间", "原始URL", "HTTP状态", "HTTPS状态", "有效URL",
-            "URL", "链接类型", "基准内容时间", "内容相似度", "差异大小",
-            "差异比例(%)", "是否判定为篡改", "篡改类型", "主要差异描述",
-            "IP地址", "IP属地(国家)", "IP属地(地区)", "IP属地(城市)", "IP服务商"
-        ]
+        fieldnames = TAMPER_CSV_FIELDNAMES
         
-        # 使用临时文件先写入，完成后再重命名
-        temp_file = f"{file_path}.tmp"
+        # 直接写入目标文件(大缓冲区，关闭时一次落盘)
         try:
-            with open(temp_file, 'w', newline='', encoding='utf-8-sig') as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                writer.writeheader()
-                
-                for result in results:
-                    row_data = {
-                        "检测时间": result.get("timestamp", ""),
-                        "原始URL": result.get("original_url", ""),
-                        "HTTP状态": result.get("http_status", ""),
-                        "HTTPS状态": result.get("https_status", ""),
-                        "有效URL": result.get("effective_url", ""),
-                        "URL": result.get("url", ""),
-                        "链接类型": result.get("link_type", "父链接"),
-                        "基准内容时间": result.get("base_content_time", ""),
-                        "内容相似度": f"{result.get('similarity', 0):.2f}",
-                        "差异大小": result.get("diff_size", 0),
-                        "差异比例(%)": f"{result.get('diff_percentage', 0):.2f}",
-                        "是否判定为篡改": "是" if result.get("is_tampered", False) else "否",
-                        "篡改类型": result.get("tamper_type", ""),
-                        "主要差异描述": result.get("diff_description", ""),
-                        "IP地址": ", ".join(result.get("ip_addresses", [])),
-                        "IP属地(国家)": result.get("ip_country", ""),
-                        "IP属地(地区)": result.get("ip_region", ""),
-                        "IP属地(城市)": result.get("ip_city", ""),
-                        "IP服务商": result.get("ip_isp", "")
-                    }
-                    
-                    # 处理可能的特殊字符
-                    for key, value in row_data.items():
-                        if isinstance(value, str):
-                            row_data[key] = value.replace('\0', '').replace('\r', '')
-                    
-                    writer.writerow(row_data)
-            
-            # 验证临时文件 - 即使没有数据也要创建包含表头的文件
-            if not os.path.exists(temp_file) or os.path.getsize(temp_file) == 0:
-                with open(temp_file, 'w', newline='', encoding='utf-8-sig') as csvfile:
-                    writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                    writer.writeheader()
-            
-            # 处理目标文件
-            if os.path.exists(file_path):
-                try:
-                    os.remove(file_path)
-                except:
-                    file_path = f"{file_path}.backup"
-            
-            os.rename(temp_file, file_path)
+            with open(file_path, 'w', buffering=1 << 20, newline='', encoding='utf-8-sig') as csvfile:
+                writer = csv.writer(csvfile)
+                writer.writerow(fieldnames)
+                writer.writerows(build_csv_rows(results, TAMPER_CSV_FIELDS))
             
-            # 最终验证
-            if os.path.exists(file_path) and os.path.getsize(file_path) > 0:
-                print(f"{Color.GREEN}篡改检测结果保存成功，文件大小: {os.path.getsize(file_path)} bytes{Color.RESET}")
-                return file_path
-            else:
-                raise Exception("文件重命名后验证失败")
+            print(f"{Color.GREEN}篡改检测结果保存成功，共 {len(results)} 条记录{Color.RESET}")
+            return file_path
                 
         except Exception as e:
-            print(f"{Color.RED}写入临时文件失败: {str(e)}{Color.RESET}")
+            print(f"{Color.RED}写入结果文件失败: {str(e)}{Color.RESET}")
             # 备选方案 - 至少保存表头
             try:
                 with open(file_path, 'w', newline='', encoding='utf-8-sig') as csvfile:
@@ -495,12 +724,6 @@ def save_tamper_results(results, base_filename="tamper_results"):
             except Exception as e2:
                 print(f"{Color.RED}应急写入也失败: {str(e2)}{Color.RESET}")
                 return None
-        finally:
-            if os.path.exists(temp_file):
-                try:
-                    os.remove(temp_file)
-                except:
-                    pass
         
     except Exception as e:
         print(f"{Color.RED}保存篡改检测结果失败: {str(e)}{Color.RESET}")
@@ -515,52 +738,106 @@ def save_tamper_results(results, base_filename="tamper_results"):
             print(f"{Color.RED}所有保存尝试都失败了{Color.RESET}")
             return None
 
+# 秒级时间字符串缓存(秒, 格式化结果)，同一秒内的日志和结果共用，避免反复strftime
+timestamp_cache = (0, "")
+
+def now_str():
+    """返回当前时间的'%Y-%m-%d %H:%M:%S'字符串(按秒缓存)"""
+    global timestamp_cache
+    now = int(time.time())
+    cached = timestamp_cache
+    if cached[0] != now:
+        cached = (now, time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(now)))
+        timestamp_cache = cached  # 整体替换元组，多线程读取无需加锁
+    return cached[1]
+
+LOG_LEVEL_COLORS = {
+    "error": Color.RED,
+    "warning": Color.YELLOW,
+    "success": Color.GREEN,
+    "info": Color.CYAN
+}
+
+def format_log_line(timestamp, level, url, message):
+    """格式化一条日志，根据日志级别选择颜色"""
+    level_color = LOG_LEVEL_COLORS.get(level, Color.RESET)
+    if url:
+        # 截断过长的URL
+        display_url = url[:50] + "..." if len(url) > 53 else url
+        return f"{level_color}[{timestamp}] [{display_url}] {message}{Color.RESET}\n"
+    return f"{level_color}[{timestamp}] {message}{Color.RESET}\n"
+
+def log_writer():
+    """后台日志线程：一次取出一批日志，拼接后单次写入终端"""
+    while True:
+        batch = [log_queue.get()]
+        while len(batch) < 256:
+            try:
+                batch.append(log_queue.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            sys.stdout.write("".join(format_log_line(*item) for item in batch))
+            sys.stdout.flush()
+        except Exception:
+            pass
+        finally:
+            for _ in batch:
+                log_queue.task_done()
+
+def flush_logs():
+    """等待队列中的日志全部写出，打印汇总信息或退出前调用"""
+    log_queue.join()
+
+if IS_MAIN_PROCESS:
+    threading.Thread(target=log_writer, daemon=True, name="log-writer").start()
+
 def log(message, url=None, level="info"):
-    """线程安全的日志输出，增加日志级别和颜色"""
-    with log_lock:
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        
-        # 根据日志级别选择颜色
-        if level == "error":
-            level_color = Color.RED
-        elif level == "warning":
-            level_color = Color.YELLOW
-        elif level == "success":
-            level_color = Color.GREEN
-        elif level == "info":
-            level_color = Color.CYAN
-        else:
-            level_color = Color.RESET
-            
-        if url:
-            # 截断过长的URL
-            display_url = url[:50] + "..." if len(url) > 53 else url
-            print(f"{level_color}[{timestamp}] [{display_url}] {message}{Color.RESET}")
-        else:
-            print(f"{level_color}[{timestamp}] {message}{Color.RESET}")
+    """线程安全的日志输出，增加日志级别和颜色（入队后由后台线程写出）"""
+    log_queue.put((now_str(), level, url, message))
+
+# 同一主机下的大量链接共用解析结果和IP属地：成功结果由lru_cache缓存；
+# 解析失败的主机名 -> 失败时间(time.monotonic())，DNS_NEGATIVE_TTL秒内不再重试，避免临时故障被一直记住
+DNS_NEGATIVE_TTL = 60
+dns_failures = {}
+
+@lru_cache(maxsize=8192)
+def resolve_hostname(hostname):
+    """解析主机名，返回去重后的IP元组(失败时抛出异常，不进入缓存)"""
+    _, _, ip_addresses = socket.gethostbyname_ex(hostname)
+    return tuple(set(ip_addresses))
 
 def get_ip_addresses(hostname):
     """获取主机名对应的IP地址列表"""
+    failed_at = dns_failures.get(hostname)
+    if failed_at is not None and time.monotonic() - failed_at < DNS_NEGATIVE_TTL:
+        return []
     try:
-        _, _, ip_addresses = socket.gethostbyname_ex(hostname)
-        return list(set(ip_addresses))  # 去重
-    except Exception as e:
+        return list(resolve_hostname(hostname))
+    except (OSError, UnicodeError) as e:
+        # OSError包括socket.gaierror；标签过长或非法的主机名在IDNA编码时抛出UnicodeError
+        dns_failures[hostname] = time.monotonic()
         log(f"解析IP地址失败: {str(e)}", hostname, "error")
         return []
 
+@lru_cache(maxsize=4096)
+def lookup_ip_location(ip):
+    """向ip-api.com查询IP属地(请求失败时抛出异常，不进入缓存)"""
+    response = get_http_session().get(f"http://ip-api.com/json/{ip}", timeout=10)
+    data = response.json()
+    if data.get("status") == "success":
+        return {
+            "country": data.get("country", ""),
+            "region": data.get("regionName", ""),
+            "city": data.get("city", ""),
+            "isp": data.get("isp", "")
+        }
+    return {"country": "", "region": "", "city": "", "isp": ""}
+
 def get_ip_location(ip):
     """获取IP地址的属地信息，使用ip-api.com"""
     try:
-        response = requests.get(f"http://ip-api.com/json/{ip}", timeout=10)
-        data = response.json()
-        if data.get("status") == "success":
-            return {
-                "country": data.get("country", ""),
-                "region": data.get("regionName", ""),
-                "city": data.get("city", ""),
-                "isp": data.get("isp", "")
-            }
-        return {"country": "", "region": "", "city": "", "isp": ""}
+        return lookup_ip_location(ip)
     except Exception as e:
         log(f"获取IP属地失败: {str(e)}", ip, "error")
         return {"country": "", "region": "", "city": "", "isp": ""}
@@ -575,6 +852,7 @@ def load_config():
         "timeout": 15,
         "default_threads": 5,
         "schedule_interval": 60,
+        "probe_leaf_links": True,  # 是否探活最深一层的子链接；关闭后只按链接本身匹配规则，不再请求页面
         "regex_flags": re.IGNORECASE,
         "rules_files": ["rules.txt"],
         # 篡改检测配置
@@ -588,8 +866,8 @@ def load_config():
     
     if os.path.exists(CONFIG_PATH):
         try:
-            with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
-                loaded = json.load(f)
+            with open(CONFIG_PATH, 'rb') as f:
+                loaded = json_loads(f.read())
                 config.update(loaded)
         except Exception as e:
             print(f"{Color.RED}加载配置文件失败: {str(e)}，使用默认配置{Color.RESET}")
@@ -598,15 +876,27 @@ def load_config():
 
 def save_config(config):
     """保存配置到文件"""
+    global CONFIG_PATH
     try:
         # 检查目录
         if not ensure_directory_exists(CONFIG_PATH):
             print(f"{Color.YELLOW}配置文件目录不可写，尝试保存到用户主目录{Color.RESET}")
-          #  global CONFIG_PATH
             CONFIG_PATH = os.path.join(os.path.expanduser("~"), ".darkscan_config.json")
             
-        with open(CONFIG_PATH, 'w', encoding='utf-8') as f:
-            json.dump(config, f, ensure_ascii=False, indent=2)
+        # 先序列化为完整的字节串，写入同目录下的临时文件后再原子替换，
+        # 写入中途被终止也不会留下截断的配置文件
+        data = json_dumps_bytes(config)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(CONFIG_PATH), prefix=".config.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, CONFIG_PATH)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
         print(f"{Color.GREEN}配置已保存到 {CONFIG_PATH}{Color.RESET}")
     except Exception as e:
         print(f"{Color.RED}保存配置文件失败: {str(e)}{Color.RESET}")
@@ -637,13 +927,10 @@ def load_urls_from_file(file_path=None):
     
     urls = []
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            for line_num, line in enumerate(f, 1):
-                url = line.strip()
-                if not url or url.startswith('#'):
-                    continue
-                # 去除URL有效性限制，接受任何非空字符串作为URL
-                urls.append(url)
+        # 一次读入整个文件再按行拆分；去除URL有效性限制，接受任何非空且非注释的行作为URL
+        with open(file_path, 'rb') as f:
+            data = f.read().decode('utf-8')
+        urls = [url for url in map(str.strip, data.splitlines()) if url and not url.startswith('#')]
         print(f"{Color.GREEN}从 {os.path.basename(file_path)} 加载了 {len(urls)} 个URL{Color.RESET}")
         return urls
     except Exception as e:
@@ -661,22 +948,37 @@ def load_urls_from_file(file_path=None):
         except:
             return []
 
+def load_urls_and_rules(config):
+    """同时读取URL文件和规则文件，返回(urls, rules)
+    
+    规则在后台线程加载；URL文件在当前线程读取，因为读取失败时需要用户手动输入
+    """
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="rules") as pool:
+        rules_future = pool.submit(load_rules, config)
+        urls = load_urls_from_file()
+        rules = rules_future.result()
+    return urls, rules
+
+# 证书验证失败、但跳过验证后可访问的https主机：之后直接跳过验证请求，不再每次先做一次必然失败的TLS握手
+insecure_hosts = set()
+
 def get_page_content(url, timeout=15):
     """获取网页内容，增加重试机制"""
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36"
-    }
-    
+    import requests
+    session = get_http_session()
+    parsed = cached_urlparse(url)
+    host = parsed.netloc.lower() if parsed.scheme == "https" else None
     # 最多重试2次
     for attempt in range(3):
         try:
-            with state_lock:
-                if global_state["is_terminated"]:
-                    return None
+            if stop_event.is_set():
+                return None
+            
+            if host and host in insecure_hosts:
+                raise requests.exceptions.SSLError("证书验证曾失败，直接跳过验证")
             
-            response = requests.get(
+            response = session.get(
                 url, 
-                headers=headers, 
                 timeout=timeout, 
                 allow_redirects=True,
                 verify=True
@@ -689,15 +991,17 @@ def get_page_content(url, timeout=15):
                 "headers": dict(response.headers)
             }
         except requests.exceptions.SSLError:
-            log(f"SSL证书错误，尝试跳过验证...", url, "warning")
+            if host not in insecure_hosts:
+                log(f"SSL证书错误，尝试跳过验证...", url, "warning")
             try:
-                response = requests.get(
+                response = session.get(
                     url, 
-                    headers=headers, 
                     timeout=timeout, 
                     allow_redirects=True,
                     verify=False
                 )
+                if host:
+                    insecure_hosts.add(host)
                 return {
                     "content": response.text,
                     "final_url": response.url,
@@ -707,13 +1011,13 @@ def get_page_content(url, timeout=15):
                 }
             except Exception as e:
                 if attempt < 2:
-                    time.sleep(1)
+                    stop_event.wait(1)  # 终止时不再等待重试间隔
                     continue
                 log(f"SSL错误: {str(e)}", url, "error")
                 return None
         except Exception as e:
             if attempt < 2:
-                time.sleep(1)
+                stop_event.wait(1)
                 continue
             log(f"获取页面失败: {str(e)}", url, "error")
             return None
@@ -735,7 +1039,7 @@ def complete_and_check_url(url, timeout=15):
     }
     
     # 提取主机名用于解析IP
-    parsed_url = urlparse(url)
+    parsed_url = cached_urlparse(url)
     hostname = parsed_url.netloc or url  # 如果没有netloc，使用原始url作为主机名
     
     # 解析IP地址
@@ -758,36 +1062,37 @@ def complete_and_check_url(url, timeout=15):
         http_url = f"http://{url}"
         https_url = f"https://{url}"
         
-        # 同时探测http和https
-        with ThreadPoolExecutor(max_workers=2) as executor:
-            http_future = executor.submit(get_page_content, http_url, timeout)
-            https_future = executor.submit(get_page_content, https_url, timeout)
-            
-            try:
-                http_result = http_future.result(timeout + 2)
-                if http_result:
-                    results['http'] = http_result
-                    results['http_status'] = f"成功 ({http_result.get('status_code')})"
-                else:
-                    results['http_status'] = "失败"
-            except Exception as e:
-                results['http_status'] = f"错误: {str(e)[:30]}"
-                
-            try:
-                https_result = https_future.result(timeout + 2)
-                if https_result:
-                    results['https'] = https_result
-                    results['https_status'] = f"成功 ({https_result.get('status_code')})"
-                else:
-                    results['https_status'] = "失败"
-            except Exception as e:
-                results['https_status'] = f"错误: {str(e)[:30]}"
+        # 同时探测http和https，提交到共享探活线程池
+        # 请求本身已有超时控制，这里不再额外限制等待时间，避免排队时误判失败
+        pool = probe_pool or init_probe_pool(5)
+        http_future = pool.submit(get_page_content, http_url, timeout)
+        https_future = pool.submit(get_page_content, https_url, timeout)
+        
+        try:
+            http_result = http_future.result()
+            if http_result:
+                results['http'] = http_result
+                results['http_status'] = f"成功 ({http_result.get('status_code')})"
+            else:
+                results['http_status'] = "失败"
+        except Exception as e:
+            results['http_status'] = f"错误: {str(e)[:30]}"
             
-            # 选择存活的URL，如果都存活优先选择https
-            if results['https']:
-                results['best_url'] = https_url
-            elif results['http']:
-                results['best_url'] = http_url
+        try:
+            https_result = https_future.result()
+            if https_result:
+                results['https'] = https_result
+                results['https_status'] = f"成功 ({https_result.get('status_code')})"
+            else:
+                results['https_status'] = "失败"
+        except Exception as e:
+            results['https_status'] = f"错误: {str(e)[:30]}"
+        
+        # 选择存活的URL，如果都存活优先选择https
+        if results['https']:
+            results['best_url'] = https_url
+        elif results['http']:
+            results['best_url'] = http_url
     else:
         # URL已经包含协议，直接探测
         try:
@@ -813,46 +1118,259 @@ def complete_and_check_url(url, timeout=15):
     
     return results
 
-def extract_links_from_tags(soup, base_url):
-    """从HTML标签提取链接，增加过滤机制"""
-    links = []
-    tags = {
-        'a': 'href',
-        'script': 'src',
-        'img': 'src',
-        'iframe': 'src',
-        'link': 'href',
-        'form': 'action'
-    }
+# 需要提取链接的标签及对应属性
+LINK_TAG_ATTRS = {
+    'a': 'href',
+    'script': 'src',
+    'img': 'src',
+    'iframe': 'src',
+    'link': 'href',
+    'form': 'action'
+}
+
+# URL解析/拼接缓存：同一页面和子页面间大量链接重复出现
+@lru_cache(maxsize=4096)
+def cached_urlparse(url):
+    return urlparse(url)
+
+@lru_cache(maxsize=8192)
+def cached_urljoin(base_url, link):
+    return urljoin(base_url, link)
+
+# 协议默认端口，规范化时去掉(http://x:80/与http://x/是同一链接)
+DEFAULT_PORT_SUFFIXES = {"http": ":80", "https": ":443"}
+
+@lru_cache(maxsize=8192)
+def canonical_url_key(url):
+    """链接去重用的规范化键：去掉#锚点和默认端口，协议和主机名转小写，空路径视为/，
+    路径中的./..段展开，查询参数按名称排序"""
+    parsed = cached_urlparse(urldefrag(url)[0])
+    netloc = parsed.netloc.lower()
+    port_suffix = DEFAULT_PORT_SUFFIXES.get(parsed.scheme)
+    if port_suffix and netloc.endswith(port_suffix):
+        netloc = netloc[:-len(port_suffix)]
+    path = parsed.path or "/"
+    if "/." in path:
+        path = urljoin("/", path)
+    query = parsed.query
+    if "&" in query:
+        query = "&".join(sorted(query.split("&")))
+    return parsed._replace(netloc=netloc, path=path, query=query).geturl()
+
+def claim_scan_links(links):
+    """在本轮扫描的已提交集合中登记链接，返回此前未被任何父链接提交过的那些"""
+    claimed = []
+    with scanned_urls_lock:
+        scanned = global_state["scanned_urls"]
+        for link in links:
+            link_key = canonical_url_key(link["absolute_link"])
+            if link_key not in scanned:
+                scanned.add(link_key)
+                claimed.append(link)
+    return claimed
+
+def extract_links_from_tags(html_content, base_url, limit=None):
+    """从HTML内容提取链接，增加过滤机制
+    
+    使用lxml.etree.iterparse边解析边收集链接，处理完的元素随即清空释放，不保留整棵DOM树；
+    结果仍按LINK_TAG_ATTRS的标签顺序排列；按补全后的绝对URL(去掉#锚点)去重。
+    指定limit时只返回前limit个链接，排在最前的标签(<a>)已凑够limit个时提前结束解析
+    """
+    if isinstance(html_content, str):
+        html_content = html_content.encode('utf-8')
+    if not html_content.strip():
+        return []
+    
+    tag_elements = {tag: [] for tag in LINK_TAG_ATTRS}
+    base_href = None
+    open_link_tags = 0  # 当前所在的链接标签层数，链接标签内部的元素要等取完文本后才能清空
+    # 排在最前的标签的有效链接已够limit个时，结果就是它们的前limit个，后面的内容不必再解析
+    first_tag = next(iter(LINK_TAG_ATTRS))
+    first_tag_keys = set()
+    
+    for event, elem in etree.iterparse(io.BytesIO(html_content), events=("start", "end"), html=True,
+                                       encoding='utf-8', recover=True):
+        tag = elem.tag
+        attr = LINK_TAG_ATTRS.get(tag)
+        if event == "start":
+            if attr is not None:
+                open_link_tags += 1
+            continue
+        
+        if attr is not None:
+            open_link_tags -= 1
+            link = elem.get(attr)
+            if link is not None:
+                # 只保留链接和标签文本，不再把整个元素序列化回HTML(没有任何地方用到)
+                tag_elements[tag].append((link, "".join(text.strip() for text in elem.itertext())))
+                
+                if limit is not None and tag == first_tag and link.strip():
+                    current_base = urljoin(base_url, base_href) if base_href is not None else base_url
+                    absolute_link = cached_urljoin(current_base, link.strip())
+                    if not absolute_link.startswith(('mailto:', 'javascript:')):
+                        first_tag_keys.add(canonical_url_key(absolute_link))
+                        if len(first_tag_keys) >= limit:
+                            break
+        elif tag == 'base' and base_href is None and elem.get('href') is not None:
+            base_href = elem.get('href').strip()
+        
+        if open_link_tags == 0:
+            # 清空已处理完的元素及其之前的兄弟节点，解析内存保持在常数级
+            elem.clear()
+            parent = elem.getparent()
+            if parent is not None:
+                while elem.getprevious() is not None:
+                    del parent[0]
+    
+    # 页面声明了<base href>时，相对链接以它为基准补全
+    if base_href is not None:
+        base_url = urljoin(base_url, base_href)
     
+    links = []
     seen_links = set()
     
-    for tag, attr in tags.items():
-        elements = soup.find_all(tag)
-        for elem in elements:
-            if attr in elem.attrs:
-                original_link = elem[attr].strip()
-                if not original_link or original_link in seen_links:
-                    continue
-                    
-                seen_links.add(original_link)
-                absolute_link = urljoin(base_url, original_link)
+    for tag, elements in tag_elements.items():
+        for link, text_content in elements:
+            original_link = link.strip()
+            if not original_link:
+                continue
+            
+            absolute_link = cached_urljoin(base_url, original_link)
+            if absolute_link.startswith(('mailto:', 'javascript:')):
+                continue
+            
+            # 同一资源的不同写法(相对/绝对、带锚点)只保留第一个，避免重复探活
+            link_key = canonical_url_key(absolute_link)
+            if link_key in seen_links:
+                continue
+            seen_links.add(link_key)
                 
-                if absolute_link.startswith(('mailto:', 'javascript:')):
-                    continue
-                    
-                links.append({
-                    'original_link': original_link,
-                    'absolute_link': absolute_link,
-                    'tag': tag,
-                    'element': str(elem),
-                    'text_content': elem.get_text(strip=True)
-                })
+            links.append({
+                'original_link': original_link,
+                'absolute_link': absolute_link,
+                'netloc': cached_urlparse(absolute_link).netloc.lower(),
+                'tag': tag,
+                'text_content': text_content
+            })
     
+    if limit is not None:
+        return links[:limit]
     return links
 
+class KeywordMatcher:
+    """不区分大小写的多关键词子串匹配器，find()返回命中的原始关键词"""
+    def __init__(self, keywords):
+        # 小写关键词 -> 原始关键词列表（大小写不同的规则各自保留）
+        self._keywords = {}
+        for keyword in keywords:
+            if keyword:
+                self._keywords.setdefault(keyword.lower(), []).append(keyword)
+        
+        self._automaton = None
+        if ahocorasick is not None and self._keywords:
+            self._automaton = ahocorasick.Automaton()
+            for lowered in self._keywords:
+                self._automaton.add_word(lowered, lowered)
+            self._automaton.make_automaton()
+    
+    def find(self, text_lower):
+        """在已转小写的文本中查找命中的关键词，每个关键词只返回一次"""
+        if self._automaton is not None:
+            hits = dict.fromkeys(lowered for _, lowered in self._automaton.iter(text_lower))
+        else:
+            hits = [lowered for lowered in self._keywords if lowered in text_lower]
+        return [keyword for lowered in hits for keyword in self._keywords[lowered]]
+
+# 正则规则合并编译结果缓存，键为(规则元组, 匹配标志)
+compiled_rules_cache = {}
+
+def compile_rules(patterns, flags):
+    """将全部正则规则合并编译成一个分支表达式，一次扫描即可判断链接是否命中任一规则
+    
+    返回 (合并后的正则, 分组名到原始规则的映射)。存在无效规则或反向引用时无法安全合并，返回 (None, {})
+    """
+    key = (tuple(patterns), flags)
+    if key in compiled_rules_cache:
+        return compiled_rules_cache[key]
+    
+    compiled = (None, {})
+    rule_names = {f"rule_{i}": pattern for i, pattern in enumerate(patterns)}
+    # 反向引用在合并后分组编号会变化，含有时不合并
+    if rule_names and not any(re.search(r'\\\d|\(\?P=', p) for p in patterns):
+        try:
+            combined = re.compile("|".join(f"(?P<{name}>{p})" for name, p in rule_names.items()), flags)
+            compiled = (combined, rule_names)
+        except re.error:
+            pass  # 合并失败时退回逐条匹配
+    
+    compiled_rules_cache[key] = compiled
+    return compiled
+
+# RE2的\w、\d、\s、\b只匹配ASCII，与标准库re的Unicode语义不同，含这些转义的规则留给re处理
+RE2_UNSAFE_ESCAPES = re.compile(r'\\[wWdDsSbB]')
+
+def compile_rule_set(patterns, flags):
+    """把能用RE2执行的正则规则编译成一个RE2::Set
+    
+    返回 (规则集, 规则集中按序号排列的原始规则)。未安装google-re2时返回 (None, [])，
+    RE2不支持的规则(反向引用、环视等)不加入规则集，由调用方用标准库re逐条匹配
+    """
+    if re2 is None or not patterns:
+        return None, []
+    
+    key = ("re2_set", tuple(patterns), flags)
+    if key in compiled_rules_cache:
+        return compiled_rules_cache[key]
+    
+    # 把标准库的匹配标志转成内联写法
+    inline_flags = "".join(flag for flag, bit in (("i", re.IGNORECASE), ("m", re.MULTILINE), ("s", re.DOTALL)) if flags & bit)
+    prefix = f"(?{inline_flags})" if inline_flags else ""
+    
+    options = re2.Options()
+    options.log_errors = False
+    rule_set = re2.Set.SearchSet(options)
+    set_patterns = []
+    for pattern in patterns:
+        if RE2_UNSAFE_ESCAPES.search(pattern):
+            continue
+        try:
+            rule_set.Add(prefix + pattern)
+        except Exception:
+            continue
+        set_patterns.append(pattern)
+    
+    compiled = (None, [])
+    if set_patterns:
+        try:
+            rule_set.Compile()
+            compiled = (rule_set, set_patterns)
+        except Exception:
+            pass
+    
+    compiled_rules_cache[key] = compiled
+    return compiled
+
+# 规则文件中的类型 -> rules字典中的键
+RULE_TYPE_KEYS = {
+    'keyword': 'keywords',
+    'domain': 'domains',
+    'regex': 'regex_patterns',
+    'content_keyword': 'content_keywords'
+}
+
+# 已加载的规则: (规则文件签名, 正则标志) -> rules，只保留最近一份；规则文件未改动时重复扫描(如定时扫描)直接复用
+loaded_rules_cache = {}
+
+def rule_files_signature(file_paths):
+    """规则文件签名: 各文件的(路径, 修改时间, 大小)，任一文件被修改后签名随之变化"""
+    signature = []
+    for file_path in file_paths:
+        stat = os.stat(file_path)
+        signature.append((file_path, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
 def load_rules(config):
-    """加载检测规则"""
+    """加载检测规则(规则文件未改动时返回上次加载的结果)"""
     if not os.path.exists(RULES_DIR):
         try:
             os.makedirs(RULES_DIR, exist_ok=True)
@@ -872,13 +1390,7 @@ def load_rules(config):
         except Exception as e:
             print(f"{Color.RED}创建默认规则文件失败: {str(e)}{Color.RESET}")
     
-    rules = {
-        "keywords": [],
-        "domains": [],
-        "regex_patterns": [],
-        "content_keywords": []
-    }
-    
+    rule_files = []
     for filename in config["rules_files"]:
         if os.path.isabs(filename):
             file_path = filename
@@ -890,34 +1402,73 @@ def load_rules(config):
         if not os.path.exists(file_path):
             print(f"{Color.YELLOW}规则文件 {filename} 不存在，已跳过{Color.RESET}")
             continue
-            
+        rule_files.append((filename, file_path))
+    
+    try:
+        cache_key = (rule_files_signature([file_path for _, file_path in rule_files]), config["regex_flags"])
+    except OSError:
+        cache_key = None  # 文件在检查后被删除等情况，不使用缓存
+    if cache_key is not None and cache_key in loaded_rules_cache:
+        print(f"{Color.GREEN}规则文件未改动，沿用已加载的规则{Color.RESET}")
+        return loaded_rules_cache[cache_key]
+    
+    rules = {
+        "keywords": [],
+        "domains": [],
+        "regex_patterns": [],
+        "content_keywords": []
+    }
+    
+    for filename, file_path in rule_files:
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                for line_num, line in enumerate(f, 1):
-                    line = line.strip()
-                    if not line or line.startswith('#'):
-                        continue
-                        
-                    if ':' in line:
-                        rule_type, rule_content = line.split(':', 1)
-                        rule_type = rule_type.strip().lower()
-                        rule_content = rule_content.strip()
-                        
-                        if rule_type == 'keyword':
-                            rules["keywords"].append(rule_content)
-                        elif rule_type == 'domain':
-                            rules["domains"].append(rule_content)
-                        elif rule_type == 'regex':
-                            rules["regex_patterns"].append(rule_content)
-                        elif rule_type == 'content_keyword':
-                            rules["content_keywords"].append(rule_content)
+            # 整个文件一次读入解码，再按行切分，避免逐行读取的开销
+            with open(file_path, 'rb') as f:
+                data = f.read().decode('utf-8')
+            
+            for line in data.splitlines():
+                line = line.strip()
+                if not line or line[0] == '#':
+                    continue
+                
+                rule_type, sep, rule_content = line.partition(':')
+                if not sep:
+                    continue
+                rule_key = RULE_TYPE_KEYS.get(rule_type.strip().lower())
+                if rule_key is not None:
+                    rules[rule_key].append(rule_content.strip())
             print(f"{Color.GREEN}已加载规则文件: {os.path.basename(file_path)}{Color.RESET}")
         except Exception as e:
             print(f"{Color.RED}加载规则文件 {filename} 失败: {str(e)}{Color.RESET}")
     
+    # 去重并保持规则文件中的先后顺序
     for key in rules:
-        rules[key] = list(set(rules[key]))
-        
+        rules[key] = list(dict.fromkeys(rules[key]))
+    
+    # 关键词、域名、内容关键词各建一个多关键词匹配器
+    rules["keyword_matcher"] = KeywordMatcher(rules["keywords"])
+    rules["domain_matcher"] = KeywordMatcher(rules["domains"])
+    rules["content_matcher"] = KeywordMatcher(rules["content_keywords"])
+    
+    # 逐条预编译正则规则，保存为(原始规则, 编译结果)；无效规则在加载时剔除，不再在每个链接上报错
+    compiled_patterns = []
+    for pattern in rules["regex_patterns"]:
+        try:
+            compiled_patterns.append((pattern, re.compile(pattern, config["regex_flags"])))
+        except re.error as e:
+            print(f"{Color.RED}无效正则表达式，已忽略: {pattern} ({str(e)}){Color.RESET}")
+    rules["regex_patterns"] = compiled_patterns
+    
+    # 能用RE2执行的规则放进一个规则集，一次扫描得到全部命中；其余规则仍逐条用re匹配
+    rules["regex_set"] = compile_rule_set([pattern for pattern, _ in compiled_patterns], config["regex_flags"])
+    set_patterns = set(rules["regex_set"][1])
+    rules["regex_fallback"] = [(pattern, compiled) for pattern, compiled in compiled_patterns if pattern not in set_patterns]
+    
+    # 合并编译逐条匹配的正则规则，供match_rules预筛选
+    rules["regex_union"] = compile_rules([pattern for pattern, _ in rules["regex_fallback"]], config["regex_flags"])
+    
+    if cache_key is not None:
+        loaded_rules_cache.clear()
+        loaded_rules_cache[cache_key] = rules
     return rules
 
 def match_rules(link_info, rules, config):
@@ -926,47 +1477,110 @@ def match_rules(link_info, rules, config):
     content_matches = []
     
     link = link_info["absolute_link"]
-    parsed = urlparse(link)
-    
-    for keyword in rules["keywords"]:
-        if keyword.lower() in link.lower():
-            url_matches.append(f"关键词: {keyword}")
-    
-    for domain in rules["domains"]:
-        if domain.lower() in parsed.netloc.lower():
-            url_matches.append(f"域名: {domain}")
-    
-    for pattern in rules["regex_patterns"]:
-        try:
-            if re.search(pattern, link, config["regex_flags"]):
+    link_lower = link.lower()
+    netloc = link_info.get("netloc")
+    if netloc is None:
+        netloc = cached_urlparse(link).netloc.lower()
+    
+    for keyword in rules["keyword_matcher"].find(link_lower):
+        url_matches.append(f"关键词: {keyword}")
+    
+    for domain in rules["domain_matcher"].find(netloc):
+        url_matches.append(f"域名: {domain}")
+    
+    regex_set, set_patterns = rules["regex_set"]
+    if regex_set is not None:
+        for index in regex_set.Match(link) or ():
+            url_matches.append(f"正则: {set_patterns[index]}")
+    
+    # 合并正则未命中时剩余规则都不会命中，跳过逐条匹配
+    regex_union, _ = rules["regex_union"]
+    if rules["regex_fallback"] and (regex_union is None or regex_union.search(link)):
+        for pattern, compiled in rules["regex_fallback"]:
+            if compiled.search(link):
                 url_matches.append(f"正则: {pattern}")
-        except re.error as e:
-            log(f"无效正则表达式: {pattern} ({str(e)})", link, "error")
     
-    for keyword in rules["content_keywords"]:
-        if keyword.lower() in link_info["text_content"].lower():
-            content_matches.append(f"内容关键词: {keyword}")
+    for keyword in rules["content_matcher"].find(link_info["text_content"].lower()):
+        content_matches.append(f"内容关键词: {keyword}")
     
     return url_matches, content_matches
 
+def build_link_result(link_info, parent_url, depth, rules, config, url_check, page_data):
+    """匹配规则并生成子链接的扫描结果；url_check为None表示未探活"""
+    url_matches, content_matches = match_rules(link_info, rules, config)
+    is_rule_match = len(url_matches) > 0
+    is_content_match = len(content_matches) > 0
+    
+    is_malicious = is_rule_match and is_content_match
+    threat_info = []
+    if is_malicious:
+        threat_info.append("匹配规则判定为恶意链接")
+    
+    if url_check is None:
+        url_check = {
+            'http_status': '未探测',
+            'https_status': '未探测',
+            'best_url': None,
+            'ip_addresses': [],
+            'ip_country': '',
+            'ip_region': '',
+            'ip_city': '',
+            'ip_isp': ''
+        }
+        status_code = "未探测"
+    else:
+        status_code = page_data.get("status_code", "未知")
+    
+    return {
+        "timestamp": now_str(),
+        "parent_url": parent_url,
+        "original_url": link_info["absolute_link"],
+        "http_status": url_check['http_status'],
+        "https_status": url_check['https_status'],
+        "effective_url": url_check['best_url'],
+        "link_type": f"{link_info['tag']}标签",
+        "original_link": link_info["original_link"],
+        "absolute_link": link_info["absolute_link"],
+        "status_code": status_code,
+        "depth": depth,
+        "url_matches": url_matches,
+        "content_matches": content_matches,
+        "tag_content": link_info["text_content"],
+        "is_rule_match": is_rule_match,
+        "is_content_match": is_content_match,
+        "is_malicious": is_malicious,
+        "threat_info": threat_info,
+        "ip_addresses": url_check['ip_addresses'],
+        "ip_country": url_check['ip_country'],
+        "ip_region": url_check['ip_region'],
+        "ip_city": url_check['ip_city'],
+        "ip_isp": url_check['ip_isp']
+    }
+
 def analyze_child_link(link_info, parent_url, depth, max_depth, rules, config, perform_tamper_check=False):
-    """分析子链接，增加线程状态跟踪，支持对一级子链接进行篡改检测"""
-    with state_lock:
-        if global_state["is_terminated"]:
-            return []
-        global_state["active_threads"] += 1
+    """分析子链接，增加线程状态跟踪，支持对一级子链接进行篡改检测
+    
+    返回(结果列表, 下一层待分析的子链接列表)，下一层由调用方提交回线程池，不在当前线程里递归
+    """
+    if stop_event.is_set():
+        return [], []
+    global_state["active_threads"].add(1)
     
     try:
         if depth > max_depth:
-            return []
+            return [], []
         
         log(f"分析子链接 (深度: {depth}): {link_info['absolute_link']}", parent_url)
         
+        # 规则只匹配链接本身和标签文本；最深一层且不做篡改检测的子链接，页面内容用不到，按配置可以不请求
+        if depth >= max_depth and not (perform_tamper_check and depth == 1) and not config.get("probe_leaf_links", True):
+            return [build_link_result(link_info, parent_url, depth, rules, config, None, None)], []
+        
         # 对子链接进行协议补全和探活
         url_check = complete_and_check_url(link_info["absolute_link"], config["timeout"])
         if not url_check['best_url']:
             log(f"子链接无法访问: {link_info['absolute_link']}", parent_url, "warning")
-            return []
+            return [], []
         
         # 获取有效URL的页面内容
         page_data = url_check['https'] if url_check['https'] else url_check['http']
@@ -988,79 +1602,28 @@ def analyze_child_link(link_info, parent_url, depth, max_depth, rules, config, p
                 ip_isp=url_check['ip_isp']
             )
             if tamper_result:
-                with state_lock:
-                    global_state["tamper_results"].append(tamper_result)
+                record_tamper_results([tamper_result])
         
-        url_matches, content_matches = match_rules(link_info, rules, config)
-        is_rule_match = len(url_matches) > 0
-        is_content_match = len(content_matches) > 0
-        
-        is_malicious = is_rule_match and is_content_match
-        threat_info = []
-        if is_malicious:
-            threat_info.append("匹配规则判定为恶意链接")
-        
-        result = {
-            "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            "parent_url": parent_url,
-            "original_url": link_info["absolute_link"],
-            "http_status": url_check['http_status'],
-            "https_status": url_check['https_status'],
-            "effective_url": url_check['best_url'],
-            "link_type": f"{link_info['tag']}标签",
-            "original_link": link_info["original_link"],
-            "absolute_link": link_info["absolute_link"],
-            "status_code": page_data.get("status_code", "未知"),
-            "depth": depth,
-            "url_matches": url_matches,
-            "content_matches": content_matches,
-            "tag_content": link_info["text_content"],
-            "is_rule_match": is_rule_match,
-            "is_content_match": is_content_match,
-            "is_malicious": is_malicious,
-            "threat_info": threat_info,
-            "ip_addresses": url_check['ip_addresses'],
-            "ip_country": url_check['ip_country'],
-            "ip_region": url_check['ip_region'],
-            "ip_city": url_check['ip_city'],
-            "ip_isp": url_check['ip_isp']
-        }
+        result = build_link_result(link_info, parent_url, depth, rules, config, url_check, page_data)
         
-        results = [result]
+        child_links = []
         if depth < max_depth:
             try:
-                soup = BeautifulSoup(page_data["content"], "html.parser")
-                child_links = extract_links_from_tags(soup, page_data["final_url"])
-                
                 max_child_analyze = 20
-                child_links = child_links[:max_child_analyze]
-                
-                for child_link in child_links:
-                    with state_lock:
-                        if global_state["is_terminated"]:
-                            break
-                    child_results = analyze_child_link(
-                        child_link, 
-                        link_info["absolute_link"], 
-                        depth + 1, 
-                        max_depth,
-                        rules,
-                        config,
-                        perform_tamper_check  # 只对一级子链接有效
-                    )
-                    results.extend(child_results)
+                child_links = extract_links_from_tags(page_data["content"], page_data["final_url"], limit=max_child_analyze)
             except Exception as e:
                 log(f"解析子链接内容失败: {str(e)}", link_info["absolute_link"], "error")
         
-        return results
+        return [result], child_links
     finally:
-        with state_lock:
-            global_state["active_threads"] -= 1
+        global_state["active_threads"].add(-1)
 
 def preprocess_html(html_content, config):
     """预处理HTML内容，移除不需要比较的部分"""
+    from bs4 import BeautifulSoup
     try:
-        soup = BeautifulSoup(html_content, "html.parser")
+        # 使用lxml(C实现)构建解析树，比纯Python的html.parser快
+        soup = BeautifulSoup(html_content, "lxml")
         
         # 移除配置中指定忽略的标签
         for tag in config["ignore_tags"]:
@@ -1078,22 +1641,122 @@ def preprocess_html(html_content, config):
             if element:
                 element.decompose()
         
-        # 移除空白字符和空行，统一格式
-        cleaned_html = re.sub(r'\s+', ' ', soup.prettify()).strip()
+        # 直接序列化(不做prettify缩进)，再把连续空白压缩成单个空格，统一格式
+        # 保留标签和属性而不是只取文本，注入的链接往往只体现在href上
+        cleaned_html = " ".join(str(soup).split())
         return cleaned_html
     except Exception as e:
         print(f"{Color.RED}HTML预处理失败: {str(e)}{Color.RESET}")
         return html_content
 
-def compare_html(base_content, current_content, config):
-    """比较两个HTML内容的差异，返回相似度和差异信息"""
+# HTML预处理进程池：BeautifulSoup解析受GIL限制，多个检测线程同时预处理时实际是串行的，
+# 放到子进程中才能用上多核。首次使用时创建，以spawn方式启动子进程，避免在多线程进程中fork
+parse_pool = None
+parse_pool_lock = threading.Lock()
+parse_pool_disabled = False
+
+def init_parse_worker():
+    """预处理子进程初始化：终止信号(Ctrl+C/Ctrl+Z)只由主进程处理"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if hasattr(signal, "SIGTSTP"):
+        signal.signal(signal.SIGTSTP, signal.SIG_IGN)
+
+def get_parse_pool():
+    """获取(首次使用时创建)预处理进程池，创建失败或已停用时返回None"""
+    global parse_pool, parse_pool_disabled
+    with parse_pool_lock:
+        if parse_pool_disabled:
+            return None
+        if parse_pool is None:
+            # 单核机器上多进程没有收益，只会增加序列化开销
+            if (os.cpu_count() or 1) < 2:
+                parse_pool_disabled = True
+                return None
+            try:
+                parse_pool = ProcessPoolExecutor(
+                    max_workers=os.cpu_count() or 1,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=init_parse_worker
+                )
+            except Exception as e:
+                parse_pool_disabled = True
+                log(f"无法创建预处理进程池，改为在检测线程中预处理: {str(e)}", level="warning")
+        return parse_pool
+
+def shutdown_parse_pool():
+    """关闭预处理进程池（退出时调用）"""
+    global parse_pool
+    with parse_pool_lock:
+        if parse_pool is not None:
+            parse_pool.shutdown(wait=False, cancel_futures=True)
+            parse_pool = None
+
+def disable_parse_pool(error):
+    """进程池损坏(子进程异常退出等)时关闭并停用，之后都在检测线程中预处理"""
+    global parse_pool, parse_pool_disabled
+    with parse_pool_lock:
+        if parse_pool_disabled:
+            return
+        parse_pool_disabled = True
+        if parse_pool is not None:
+            parse_pool.shutdown(wait=False, cancel_futures=True)
+            parse_pool = None
+    log(f"预处理进程池不可用，改为在检测线程中预处理: {str(error)}", level="warning")
+
+def preprocess_html_parallel(html_content, config):
+    """在预处理进程池中执行preprocess_html，进程池不可用时退回当前线程"""
+    pool = get_parse_pool()
+    if pool is not None:
+        # 只传预处理需要的忽略规则，减少跨进程序列化的数据量
+        ignore_config = {
+            "ignore_tags": config["ignore_tags"],
+            "ignore_classes": config["ignore_classes"],
+            "ignore_ids": config["ignore_ids"]
+        }
+        try:
+            return pool.submit(preprocess_html, html_content, ignore_config).result()
+        except (BrokenExecutor, RuntimeError) as e:
+            # BrokenProcessPool: 子进程异常退出；RuntimeError: 进程池已关闭，无法再提交
+            disable_parse_pool(e)
+        except Exception as e:
+            # 单个页面的错误(如内容无法序列化)不影响进程池，本页改在当前线程预处理
+            log(f"进程池预处理页面失败，改在检测线程中预处理: {str(e)}", level="warning")
+    return preprocess_html(html_content, config)
+
+def content_digest(text):
+    """计算预处理后内容的摘要，用于快速判断页面与基准是否完全一致"""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+# 预处理后的内容已压缩为一行，比对差异时按标签边界切分成行
+HTML_LINE_SPLIT = re.compile(r'(?=<)')
+
+def split_html_lines(text):
+    """把预处理后的HTML按标签切分成行(每行以一个标签开头)，去掉空行"""
+    return [line for line in (part.strip() for part in HTML_LINE_SPLIT.split(text)) if line]
+
+def shingle_set(text, ngram=5):
+    """按空白切词后生成5词组shingle的哈希集合，用于计算Jaccard相似度"""
+    tokens = text.split()
+    if len(tokens) < ngram:
+        return {hash(tuple(tokens))} if tokens else set()
+    return {hash(tuple(tokens[i:i + ngram])) for i in range(len(tokens) - ngram + 1)}
+
+def compare_html(base_content, current_content, config, current_clean=None, base_clean=None):
+    """比较两个HTML内容的差异，返回相似度和差异信息（current_clean/base_clean为已预处理的内容，可选）"""
     # 预处理内容
-    base_clean = preprocess_html(base_content, config)
-    current_clean = preprocess_html(current_content, config)
-    
-    # 计算相似度
-    matcher = SequenceMatcher(None, base_clean, current_clean)
-    similarity = matcher.ratio()
+    if base_clean is None:
+        base_clean = preprocess_html(base_content, config)
+    if current_clean is None:
+        current_clean = preprocess_html(current_content, config)
+    
+    # 计算相似度（shingle集合的Jaccard系数，线性复杂度）
+    if base_clean == current_clean:
+        similarity = 1.0
+    else:
+        base_shingles = shingle_set(base_clean)
+        current_shingles = shingle_set(current_clean)
+        union_size = len(base_shingles | current_shingles)
+        similarity = len(base_shingles & current_shingles) / union_size if union_size else 1.0
     
     # 计算差异大小
     base_length = len(base_clean)
@@ -1109,21 +1772,19 @@ def compare_html(base_content, current_content, config):
         # 计算差异百分比
         diff_percentage = (1 - similarity) * 100
     
-    # 生成差异描述
-    differ = Differ()
-    diff = list(differ.compare(
-        base_clean.splitlines(), 
-        current_clean.splitlines()
-    ))
+    # 判定是否为篡改
+    is_tampered = similarity < config["tamper_sensitivity"] or \
+                  diff_size > config["significant_changes"]
     
-    # 提取主要差异
+    # 仅对判定为篡改的页面统计新增/删除的行，生成差异描述
+    # 用行的多重集合做差(线性复杂度)，代替逐行序列比对；结果按行在页面中出现的先后排列
     added = []
     removed = []
-    for line in diff:
-        if line.startswith('+ '):
-            added.append(line[2:])
-        elif line.startswith('- '):
-            removed.append(line[2:])
+    if is_tampered:
+        base_lines = Counter(split_html_lines(base_clean))
+        current_lines = Counter(split_html_lines(current_clean))
+        added = list((current_lines - base_lines).elements())
+        removed = list((base_lines - current_lines).elements())
     
     # 确定篡改类型
     tamper_type = ""
@@ -1143,10 +1804,6 @@ def compare_html(base_content, current_content, config):
             diff_description += " | "
         diff_description += f"删除 {len(removed)} 行: {removed[0][:100]}..."
     
-    # 判定是否为篡改
-    is_tampered = similarity < config["tamper_sensitivity"] or \
-                  diff_size > config["significant_changes"]
-    
     return {
         "similarity": similarity,
         "diff_size": diff_size,
@@ -1158,28 +1815,175 @@ def compare_html(base_content, current_content, config):
         "removed_lines": len(removed)
     }
 
+def get_base_db():
+    """打开(或复用)基准内容库"""
+    global base_db
+    with base_db_lock:
+        if base_db is None:
+            os.makedirs(BASE_CONTENTS_DIR, exist_ok=True)
+            conn = sqlite3.connect(os.path.join(BASE_CONTENTS_DIR, BASE_DB_NAME), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS base(url TEXT PRIMARY KEY, ts TEXT, digest BLOB, html BLOB, clean BLOB, clean_key TEXT)")
+            # 旧版库没有预处理内容列，补上(旧记录的clean为空，读取时回退到预处理原始HTML)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(base)")}
+            for column, column_type in (("clean", "BLOB"), ("clean_key", "TEXT")):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE base ADD COLUMN {column} {column_type}")
+            conn.commit()
+            base_db = conn
+        return base_db
+
+def commit_base_db(timeout=-1):
+    """提交尚未提交的基准内容写入；timeout为等待库锁的秒数(-1为一直等待)"""
+    global base_db_uncommitted
+    if not base_db_lock.acquire(timeout=timeout):
+        return False
+    try:
+        if base_db is not None and base_db_uncommitted:
+            base_db.commit()
+            base_db_uncommitted = 0
+        return True
+    finally:
+        base_db_lock.release()
+
+def close_base_db():
+    """关闭基准内容库连接（切换目录或退出时调用），关闭前提交未提交的写入"""
+    global base_db, base_db_uncommitted
+    with base_db_lock:
+        if base_db is not None:
+            if base_db_uncommitted:
+                base_db.commit()
+                base_db_uncommitted = 0
+            base_db.close()
+            base_db = None
+
+def get_ignore_settings(config):
+    """取出预处理用的忽略规则，转成可哈希的元组（用作缓存键）"""
+    return (
+        tuple(config["ignore_tags"]),
+        tuple(config["ignore_classes"]),
+        tuple(config["ignore_ids"])
+    )
+
+def save_base_content(url, html_content, config):
+    """保存URL的基准内容：压缩的原始HTML + 压缩的预处理后内容及其摘要"""
+    clean_content = preprocess_html_parallel(html_content, config)
+    digest = content_digest(clean_content)
+    html_blob = compress_text(html_content)
+    clean_blob = compress_text(clean_content)
+    # 记录生成预处理内容时的忽略规则，规则变化后读取时会重新预处理原始HTML
+    clean_key = repr(get_ignore_settings(config))
+    timestamp = now_str()
+    
+    global base_db_uncommitted
+    db = get_base_db()
+    with base_db_lock:
+        db.execute(
+            "INSERT OR REPLACE INTO base(url, ts, digest, html, clean, clean_key) VALUES (?, ?, ?, ?, ?, ?)",
+            (url, timestamp, digest, html_blob, clean_blob, clean_key)
+        )
+        # 攒够一批再提交，避免每个页面一次事务提交(一次WAL写入和同步)
+        base_db_uncommitted += 1
+        if base_db_uncommitted >= BASE_DB_COMMIT_BATCH:
+            db.commit()
+            base_db_uncommitted = 0
+
+def load_base_record(url):
+    """读取URL的基准记录，返回(保存时间, 内容摘要)，不存在时返回None"""
+    db = get_base_db()
+    with base_db_lock:
+        row = db.execute("SELECT ts, digest FROM base WHERE url=?", (url,)).fetchone()
+    if row is None:
+        return None
+    return row[0], row[1]
+
+def load_base_html(url):
+    """读取并解压URL的基准HTML，不存在时返回None"""
+    db = get_base_db()
+    with base_db_lock:
+        row = db.execute("SELECT html FROM base WHERE url=?", (url,)).fetchone()
+    if row is None:
+        return None
+    return decompress_text(row[0])
+
+@lru_cache(maxsize=1024)
+def load_base_clean(url, base_time, ignore_settings):
+    """读取基准的预处理内容，按(URL, 基准时间, 忽略规则)缓存，重新保存基准或修改忽略规则后自动失效"""
+    db = get_base_db()
+    with base_db_lock:
+        row = db.execute("SELECT clean, clean_key FROM base WHERE url=?", (url,)).fetchone()
+    if row is None:
+        return None
+    # 保存时已存了相同忽略规则下的预处理结果，直接解压使用
+    if row[0] is not None and row[1] == repr(ignore_settings):
+        return decompress_text(row[0])
+    
+    html_content = load_base_html(url)
+    if html_content is None:
+        return None
+    ignore_tags, ignore_classes, ignore_ids = ignore_settings
+    return preprocess_html_parallel(html_content, {
+        "ignore_tags": ignore_tags,
+        "ignore_classes": ignore_classes,
+        "ignore_ids": ignore_ids
+    })
+
+def base_content_exists(url):
+    """检查URL是否已有基准内容"""
+    db = get_base_db()
+    with base_db_lock:
+        return db.execute("SELECT 1 FROM base WHERE url=? LIMIT 1", (url,)).fetchone() is not None
+
+def has_any_base_content(urls, config):
+    """检查URL列表中是否至少有一个URL已保存基准内容
+    
+    先按补全协议后可能的记录键直接查库，不发请求；库中有记录但都对不上时(如跳转后的URL)，
+    再逐个探活按实际访问的URL确认
+    """
+    db = get_base_db()
+    with base_db_lock:
+        if db.execute("SELECT 1 FROM base LIMIT 1").fetchone() is None:
+            return False
+    
+    candidates = []
+    for url in urls:
+        if url.startswith(('http://', 'https://')):
+            candidates.append(url)
+        else:
+            candidates.extend((f"https://{url}", f"http://{url}"))
+    
+    # 分批查询，避免超过SQLite单条语句的参数个数限制
+    batch_size = 500
+    for start in range(0, len(candidates), batch_size):
+        batch = candidates[start:start + batch_size]
+        placeholders = ",".join("?" * len(batch))
+        with base_db_lock:
+            if db.execute(f"SELECT 1 FROM base WHERE url IN ({placeholders}) LIMIT 1", batch).fetchone():
+                return True
+    
+    for url in urls:
+        url_check = complete_and_check_url(url, config["timeout"])
+        if url_check['best_url'] and base_content_exists(url_check['best_url']):
+            return True
+    return False
+
 def detect_tampering(url, current_content, config, link_type="父链接", original_url=None, 
                    http_status=None, https_status=None, ip_addresses=None, 
                    ip_country=None, ip_region=None, ip_city=None, ip_isp=None):
     """检测单个URL是否被篡改，支持标记链接类型和协议状态，包含IP信息"""
-    # 获取基准内容
-    parsed_url = urlparse(url)
-    filename = f"{parsed_url.netloc.replace(':', '_')}_{hash(url)}.html"  # 使用哈希确保唯一性
-    base_path = os.path.join(BASE_CONTENTS_DIR, filename)
-    
-    if not os.path.exists(base_path):
-        log(f"未找到基准内容，跳过此URL的篡改检测", url, "warning")
-        return None
-    
-    # 读取基准内容
+    # 获取基准记录（此时只读出摘要，HTML需要时再读取解压）
     try:
-        with open(base_path, 'r', encoding='utf-8') as f:
-            base_content = f.read()
-        base_time = datetime.fromtimestamp(os.path.getctime(base_path)).strftime('%Y-%m-%d %H:%M:%S')
+        record = load_base_record(url)
     except Exception as e:
         log(f"读取基准内容失败: {str(e)}", url, "error")
         return None
     
+    if record is None:
+        log(f"未找到基准内容，跳过此URL的篡改检测", url, "warning")
+        return None
+    base_time, base_digest = record
+    
     # 如果没有提供当前内容，则获取它
     if not current_content:
         # 进行协议补全和探活
@@ -1212,12 +2016,33 @@ def detect_tampering(url, current_content, config, link_type="父链接", origin
     else:
         status_code = "已获取"
     
-    # 比较内容
-    comparison = compare_html(base_content, current_content, config)
+    # 比较内容：摘要与基准一致时直接判定未变化，否则解压基准HTML做完整比较
+    current_clean = preprocess_html_parallel(current_content, config)
+    if content_digest(current_clean) == base_digest:
+        comparison = {
+            "similarity": 1.0,
+            "diff_size": 0,
+            "diff_percentage": 0,
+            "is_tampered": False,
+            "tamper_type": "",
+            "diff_description": "",
+            "added_lines": 0,
+            "removed_lines": 0
+        }
+    else:
+        try:
+            base_clean = load_base_clean(url, base_time, get_ignore_settings(config))
+        except Exception as e:
+            log(f"读取基准内容失败: {str(e)}", url, "error")
+            return None
+        if base_clean is None:
+            log(f"未找到基准内容，跳过此URL的篡改检测", url, "warning")
+            return None
+        comparison = compare_html(None, current_content, config, current_clean=current_clean, base_clean=base_clean)
     
     # 构建结果
     result = {
-        "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "timestamp": now_str(),
         "original_url": original_url or url,
         "http_status": http_status or "未检测",
         "https_status": https_status or "未检测",
@@ -1253,13 +2078,15 @@ def run_tamper_detection(urls, config, include_children=True):
     os.makedirs(TAMPER_RESULTS_DIR, exist_ok=True)
     
     # 初始化全局状态
-    with state_lock:
-        global_state["start_time"] = datetime.now()
-        global_state["total_urls"] = len(urls)
-        global_state["processed_urls"] = 0
-        global_state["tamper_results"] = []
-        global_state["is_terminated"] = False
-        global_state["active_threads"] = 0
+    global_state["start_time"] = datetime.now()
+    global_state["total_urls"] = len(urls)
+    stop_event.clear()
+    global_state["processed_urls"].reset()
+    global_state["tamper_results"].reset()
+    global_state["tamper_count"].reset()
+    global_state["active_threads"].reset()
+    with checked_child_urls_lock:
+        global_state["checked_child_urls"] = set()
     
     # 显示终止提示
     if sys.platform.startswith('win32'):
@@ -1274,13 +2101,11 @@ def run_tamper_detection(urls, config, include_children=True):
     
     # 启动进度显示线程
     def progress_monitor():
+        last_text = None
         while True:
-            with state_lock:
-                processed = global_state["processed_urls"]
-                total = global_state["total_urls"]
-                current_url = global_state["current_url"]
-                is_terminated = global_state["is_terminated"]
-                tamper_count = sum(1 for r in global_state["tamper_results"] if r["is_tampered"])
+            total, processed, _, current_url, _ = publish_status_snapshot()
+            is_terminated = stop_event.is_set()
+            tamper_count = global_state["tamper_count"].value()
                 
             if total == 0:
                 progress = 0
@@ -1292,12 +2117,18 @@ def run_tamper_detection(urls, config, include_children=True):
             filled_length = int(bar_length * progress / 100)
             progress_bar = f"{'#' * filled_length}{'-' * (bar_length - filled_length)}"
                 
-            print(f"\r{Color.BOLD}检测进度: {processed}/{total} ({progress:.1f}%) [{progress_bar}] 已发现篡改: {tamper_count} {Color.RESET} 当前: {current_url[:50] if current_url else '准备中'}", end="")
+            progress_text = f"\r{Color.BOLD}检测进度: {processed}/{total} ({progress:.1f}%) [{progress_bar}] 已发现篡改: {tamper_count} {Color.RESET} 当前: {current_url[:50] if current_url else '准备中'}"
+            # 内容有变化时才重绘
+            if progress_text != last_text:
+                print(progress_text, end="")
+                last_text = progress_text
             
             if is_terminated or processed >= total:
                 break
-                
-            time.sleep(1)
+            
+            # 有URL处理完或收到终止信号时立即醒来，否则每秒刷新一次
+            progress_event.wait(1)
+            progress_event.clear()
     
     progress_thread = threading.Thread(target=progress_monitor, daemon=True)
     progress_thread.start()
@@ -1315,46 +2146,42 @@ def run_tamper_detection(urls, config, include_children=True):
                     futures.append(executor.submit(detect_child_tampering, url, config))
             
             for future in as_completed(futures):
-                with state_lock:
-                    if global_state["is_terminated"]:
-                        executor.shutdown(wait=False, cancel_futures=True)
-                        break
+                if stop_event.is_set():
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    break
                 try:
                     result = future.result()
                     if result and isinstance(result, list):
                         # 处理子链接的多个结果
-                        with state_lock:
-                            global_state["tamper_results"].extend(result)
+                        record_tamper_results(result)
                     elif result:
                         # 处理父链接的单个结果
-                        with state_lock:
-                            global_state["tamper_results"].append(result)
+                        record_tamper_results([result])
                 except Exception as e:
                     log(f"URL篡改检测失败: {str(e)}", level="error")
                 finally:
-                    with state_lock:
-                        global_state["processed_urls"] += 1
+                    mark_url_processed()
     except Exception as e:
         print(f"{Color.RED}篡改检测过程出错: {str(e)}{Color.RESET}")
-        with state_lock:
-            if not global_state["is_terminated"]:
-                global_state["is_terminated"] = True
+        request_stop()
     
     # 等待进度线程结束
     progress_thread.join()
+    flush_logs()
     print()
     
     # 保存结果 - 无论结果如何都保存
-    with state_lock:
-        save_path = save_tamper_results(global_state["tamper_results"])
-        if save_path:
-            tamper_count = sum(1 for r in global_state["tamper_results"] if r["is_tampered"])
-            print(f"\n{Color.GREEN}篡改检测完成，结果已保存至: {save_path}{Color.RESET}")
-            print(f"{Color.YELLOW}共检测到 {tamper_count} 个可能被篡改的页面{Color.RESET}")
-        else:
-            print(f"\n{Color.RED}篡改检测完成，但保存结果失败{Color.RESET}")
+    tamper_results = global_state["tamper_results"].merged()
+    with global_state["save_lock"]:
+        save_path = save_tamper_results(tamper_results)
+    if save_path:
+        tamper_count = sum(1 for r in tamper_results if r["is_tampered"])
+        print(f"\n{Color.GREEN}篡改检测完成，结果已保存至: {save_path}{Color.RESET}")
+        print(f"{Color.YELLOW}共检测到 {tamper_count} 个可能被篡改的页面{Color.RESET}")
+    else:
+        print(f"\n{Color.RED}篡改检测完成，但保存结果失败{Color.RESET}")
     
-    return global_state["tamper_results"]
+    return tamper_results
 
 def process_tamper_parent_url(url, config):
     """处理父链接的篡改检测，先进行协议补全和探活"""
@@ -1366,7 +2193,7 @@ def process_tamper_parent_url(url, config):
         log(f"父链接无法访问: {url}", url, "warning")
         # 即使无法访问，也记录结果
         return {
-            "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            "timestamp": now_str(),
             "original_url": url,
             "http_status": url_check['http_status'],
             "https_status": url_check['https_status'],
@@ -1421,13 +2248,10 @@ def detect_child_tampering(parent_url, config):
     
     # 提取一级子链接
     try:
-        soup = BeautifulSoup(page_data["content"], "html.parser")
-        child_links = extract_links_from_tags(soup, page_data["final_url"])
-        log(f"提取到 {len(child_links)} 个子链接进行篡改检测", parent_url)
-        
-        # 限制子链接数量，避免过多检测
+        # 限制子链接数量，避免过多检测(凑够数量即停止解析)
         max_children = 10
-        child_links = child_links[:max_children]
+        child_links = extract_links_from_tags(page_data["content"], page_data["final_url"], limit=max_children)
+        log(f"提取到 {len(child_links)} 个子链接进行篡改检测", parent_url)
     except Exception as e:
         log(f"解析HTML失败: {str(e)}", parent_url, "error")
         return []
@@ -1435,9 +2259,15 @@ def detect_child_tampering(parent_url, config):
     # 检测每个子链接
     results = []
     for link in child_links:
-        with state_lock:
-            if global_state["is_terminated"]:
-                break
+        if stop_event.is_set():
+            break
+        
+        # 其他父链接已检测过的子链接不再重复获取和比较
+        link_key = canonical_url_key(link["absolute_link"])
+        with checked_child_urls_lock:
+            if link_key in global_state["checked_child_urls"]:
+                continue
+            global_state["checked_child_urls"].add(link_key)
                 
         # 对子链接进行协议补全和探活
         child_url_check = complete_and_check_url(link["absolute_link"], config["timeout"])
@@ -1445,7 +2275,7 @@ def detect_child_tampering(parent_url, config):
             log(f"子链接无法访问: {link['absolute_link']}", parent_url, "warning")
             # 即使无法访问，也记录结果
             results.append({
-                "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                "timestamp": now_str(),
                 "original_url": link["absolute_link"],
                 "http_status": child_url_check['http_status'],
                 "https_status": child_url_check['https_status'],
@@ -1491,14 +2321,12 @@ def detect_child_tampering(parent_url, config):
 
 def run_single_scan(url, max_depth, rules, config, perform_tamper_check=False):
     """扫描单个URL，增加状态跟踪，篡改检测针对父链接和一级子链接"""
-    with state_lock:
-        if global_state["is_terminated"]:
-            return []
+    if stop_event.is_set():
+        return []
     
     log("开始检测...", url)
     
-    with state_lock:
-        global_state["current_url"] = url
+    global_state["current_url"] = url
     
     # 进行协议补全和探活
     url_check = complete_and_check_url(url, config["timeout"])
@@ -1506,7 +2334,7 @@ def run_single_scan(url, max_depth, rules, config, perform_tamper_check=False):
         log(f"URL无法访问: {url}", url, "error")
         # 即使无法访问，也记录结果
         result = {
-            "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            "timestamp": now_str(),
             "parent_url": "N/A",
             "original_url": url,
             "http_status": url_check['http_status'],
@@ -1530,10 +2358,9 @@ def run_single_scan(url, max_depth, rules, config, perform_tamper_check=False):
             "ip_city": url_check['ip_city'],
             "ip_isp": url_check['ip_isp']
         }
-        with state_lock:
-            global_state["results"].append(result)
-            global_state["processed_urls"] += 1
-            global_state["current_url"] = None
+        record_scan_results([result])
+        mark_url_processed()
+        global_state["current_url"] = None
         return [result]
     
     # 获取有效URL的页面内容
@@ -1556,68 +2383,93 @@ def run_single_scan(url, max_depth, rules, config, perform_tamper_check=False):
             ip_isp=url_check['ip_isp']
         )
         if tamper_result:
-            with state_lock:
-                global_state["tamper_results"].append(tamper_result)
+            record_tamper_results([tamper_result])
     
     try:
-        soup = BeautifulSoup(page_data["content"], "html.parser")
-        links = extract_links_from_tags(soup, page_data["final_url"])
+        links = extract_links_from_tags(page_data["content"], page_data["final_url"])
         log(f"提取到 {len(links)} 个链接", url)
     except Exception as e:
         log(f"解析HTML失败: {str(e)}", url, "error")
-        with state_lock:
-            global_state["processed_urls"] += 1
-            global_state["current_url"] = None
+        mark_url_processed()
+        global_state["current_url"] = None
         return []
     
     results = []
-    link_threads = min(5, max(1, len(links) // 3))
-    
-    with ThreadPoolExecutor(max_workers=link_threads) as executor:
-        futures = [executor.submit(
-            analyze_child_link, 
-            link, 
-            url_check['best_url'], 
-            1, 
-            max_depth,
-            rules,
-            config,
-            perform_tamper_check  # 对一级子链接进行篡改检测
-        ) for link in links]
-        
-        for future in as_completed(futures):
-            with state_lock:
-                if global_state["is_terminated"]:
-                    executor.shutdown(wait=False)
-                    break
+    # 子链接提交到共享的link_pool(由run_batch_scan确保已创建)，而不是每个URL各开一个线程池
+    executor = link_pool
+    
+    # 同一页面被多处(包括其他父链接)引用时只获取和分析一次，先登记父链接本身
+    with scanned_urls_lock:
+        global_state["scanned_urls"].add(canonical_url_key(url_check['best_url']))
+    links = claim_scan_links(links)
+    
+    # 待完成任务 -> (链接, 深度)；每个子链接分析完后把它的下一层子链接提交回同一个线程池，
+    # 而不是在工作线程里递归，深层子树也能由所有工作线程分担
+    pending = {executor.submit(
+        analyze_child_link, 
+        link, 
+        url_check['best_url'], 
+        1, 
+        max_depth,
+        rules,
+        config,
+        perform_tamper_check  # 对一级子链接进行篡改检测
+    ): (link, 1) for link in links}
+    
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        if stop_event.is_set():
+            for future in pending:
+                future.cancel()
+            break
+        for future in done:
+            link, depth = pending.pop(future)
             try:
-                link_results = future.result()
-                results.extend(link_results)
+                link_results, child_links = future.result()
             except Exception as e:
                 log(f"链接分析失败: {str(e)}", url, "error")
+                continue
+            results.extend(link_results)
+            for child_link in claim_scan_links(child_links):
+                pending[executor.submit(
+                    analyze_child_link,
+                    child_link,
+                    link["absolute_link"],
+                    depth + 1,
+                    max_depth,
+                    rules,
+                    config,
+                    perform_tamper_check  # 只对一级子链接有效
+                )] = (child_link, depth + 1)
     
-    with state_lock:
-        global_state["processed_urls"] += 1
-        global_state["current_url"] = None
-        global_state["results"].extend(results)
+    record_scan_results(results)
+    mark_url_processed()
+    global_state["current_url"] = None
     
     log("检测完成", url, "success")
     return results
 
-def run_batch_scan(urls, max_depth, config, perform_tamper_check=False):
-    """批量扫描URL，篡改检测针对父链接和一级子链接"""
-    rules = load_rules(config)
-    
-    with state_lock:
-        global_state["start_time"] = datetime.now()
-        global_state["total_urls"] = len(urls)
-        global_state["processed_urls"] = 0
-        global_state["results"] = []
-        # 如果要进行篡改检测，初始化篡改结果列表
-        if perform_tamper_check:
-            global_state["tamper_results"] = []
-        global_state["is_terminated"] = False
-        global_state["active_threads"] = 0
+def run_batch_scan(urls, max_depth, config, perform_tamper_check=False, rules=None):
+    """批量扫描URL，篡改检测针对父链接和一级子链接（rules为已加载的规则，可选）
+    
+    扫描结果边扫描边写入结果文件，不在内存中累积；返回扫描结果文件路径(保存失败时为None)
+    """
+    if rules is None:
+        rules = load_rules(config)
+    
+    global_state["start_time"] = datetime.now()
+    global_state["total_urls"] = len(urls)
+    stop_event.clear()
+    global_state["processed_urls"].reset()
+    global_state["results"].reset()
+    global_state["malicious_count"].reset()
+    # 如果要进行篡改检测，初始化篡改结果列表
+    if perform_tamper_check:
+        global_state["tamper_results"].reset()
+        global_state["tamper_count"].reset()
+    global_state["active_threads"].reset()
+    with scanned_urls_lock:
+        global_state["scanned_urls"] = set()
     
     if sys.platform.startswith('win32'):
         termination_hint = "Ctrl+C"
@@ -1630,15 +2482,13 @@ def run_batch_scan(urls, max_depth, config, perform_tamper_check=False):
     print(f"{Color.YELLOW}提示: 按 {termination_hint} 可强制终止并保存当前结果{Color.RESET}\n")
     
     def progress_monitor():
+        last_text = None
         while True:
-            with state_lock:
-                processed = global_state["processed_urls"]
-                total = global_state["total_urls"]
-                current_url = global_state["current_url"]
-                is_terminated = global_state["is_terminated"]
-                # 如果进行篡改检测，显示篡改计数
-                tamper_count = sum(1 for r in global_state["tamper_results"] if r["is_tampered"]) if perform_tamper_check else 0
-                malicious_count = sum(1 for link in global_state["results"] if link["is_malicious"])
+            total, processed, _, current_url, _ = publish_status_snapshot()
+            is_terminated = stop_event.is_set()
+            # 如果进行篡改检测，显示篡改计数
+            tamper_count = global_state["tamper_count"].value() if perform_tamper_check else 0
+            malicious_count = global_state["malicious_count"].value()
                 
             if total == 0:
                 progress = 0
@@ -1655,13 +2505,27 @@ def run_batch_scan(urls, max_depth, config, perform_tamper_check=False):
                 progress_text = f"\r{Color.BOLD}扫描进度: {processed}/{total} ({progress:.1f}%) [{progress_bar}] 可疑链接: {malicious_count} 已发现篡改: {tamper_count} {Color.RESET} 当前: {current_url[:50] if current_url else '准备中'}"
             else:
                 progress_text = f"\r{Color.BOLD}扫描进度: {processed}/{total} ({progress:.1f}%) [{progress_bar}] 可疑链接: {malicious_count} {Color.RESET} 当前: {current_url[:50] if current_url else '准备中'}"
-                
-            print(progress_text, end="")
+            
+            # 内容有变化时才重绘
+            if progress_text != last_text:
+                print(progress_text, end="")
+                last_text = progress_text
             
             if is_terminated or processed >= total:
                 break
-                
-            time.sleep(1)
+            
+            # 有URL处理完或收到终止信号时立即醒来，否则每秒刷新一次
+            progress_event.wait(1)
+            progress_event.clear()
+    
+    if link_pool is None:
+        init_probe_pool(config["default_threads"])
+    
+    # 结果文件在扫描开始时创建，创建失败时结果暂存内存，扫描结束后一次性保存
+    stream = open_result_stream(SCAN_RESULTS_DIR, "scan_results", SCAN_CSV_FIELDS)
+    if stream:
+        print(f"{Color.CYAN}扫描结果将实时写入: {stream.file_path}{Color.RESET}\n")
+    global_state["result_stream"] = stream
     
     progress_thread = threading.Thread(target=progress_monitor, daemon=True)
     progress_thread.start()
@@ -1669,59 +2533,122 @@ def run_batch_scan(urls, max_depth, config, perform_tamper_check=False):
     try:
         with ThreadPoolExecutor(max_workers=config["default_threads"]) as executor:
             # 提交扫描任务，篡改检测针对父链接和一级子链接
-            futures = {
-                executor.submit(
-                    run_single_scan, 
-                    url, 
-                    max_depth, 
-                    rules, 
-                    config,
-                    perform_tamper_check  # 传递是否进行篡改检测的参数
-                ): url for url in urls
-            }
+            # 滑动窗口提交：同时最多保留线程数2倍的任务，完成一个再补一个，URL很多时不会一次创建全部Future
+            url_iter = iter(urls)
+            window = config["default_threads"] * 2
+            futures = {}
             
-            for future in as_completed(futures):
-                with state_lock:
-                    if global_state["is_terminated"]:
-                        executor.shutdown(wait=False, cancel_futures=True)
-                        break
-                url = futures[future]
-                try:
-                    future.result()
-                except Exception as e:
-                    log(f"URL扫描失败: {str(e)}", url, "error")
+            def submit_next():
+                url = next(url_iter, None)
+                if url is not None:
+                    futures[executor.submit(
+                        run_single_scan, 
+                        url, 
+                        max_depth, 
+                        rules, 
+                        config,
+                        perform_tamper_check  # 传递是否进行篡改检测的参数
+                    )] = url
+            
+            for _ in range(window):
+                submit_next()
+            
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                if stop_event.is_set():
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    break
+                for future in done:
+                    url = futures.pop(future)
+                    try:
+                        future.result()
+                    except Exception as e:
+                        log(f"URL扫描失败: {str(e)}", url, "error")
+                    submit_next()
     except Exception as e:
         print(f"{Color.RED}扫描过程出错: {str(e)}{Color.RESET}")
-        with state_lock:
-            if not global_state["is_terminated"]:
-                global_state["is_terminated"] = True
+        request_stop()
     
     progress_thread.join()
+    flush_logs()
     print()
     
     # 保存结果 - 无论结果如何都保存
-    with state_lock:
-        # 保存扫描结果
-        save_path = save_scan_results(global_state["results"])
+    global_state["result_stream"] = None
+    with global_state["save_lock"]:
+        # 写完流式结果文件；未能创建结果文件时保存内存中的结果
+        if stream:
+            count = stream.close()
+            save_path = stream.file_path
+            print(f"{Color.GREEN}扫描结果保存成功，共 {count} 条记录{Color.RESET}")
+        else:
+            save_path = save_scan_results(global_state["results"].merged())
         if save_path:
             print(f"\n{Color.GREEN}扫描完成，结果已保存至: {save_path}{Color.RESET}")
             
-            malicious_count = sum(1 for link in global_state["results"] if link["is_malicious"])
+            malicious_count = global_state["malicious_count"].value()
             print(f"{Color.YELLOW}发现 {malicious_count} 个可疑恶意链接{Color.RESET}")
         else:
             print(f"\n{Color.RED}扫描完成，但保存扫描结果失败{Color.RESET}")
         
         # 如果进行了篡改检测，保存篡改检测结果
         if perform_tamper_check:
-            tamper_save_path = save_tamper_results(global_state["tamper_results"])
+            tamper_results = global_state["tamper_results"].merged()
+            tamper_save_path = save_tamper_results(tamper_results)
             if tamper_save_path:
-                tamper_count = sum(1 for r in global_state["tamper_results"] if r["is_tampered"])
+                tamper_count = sum(1 for r in tamper_results if r["is_tampered"])
                 print(f"{Color.GREEN}篡改检测完成，结果已保存至: {tamper_save_path}{Color.RESET}")
                 print(f"{Color.YELLOW}共检测到 {tamper_count} 个可能被篡改的页面{Color.RESET}")
             else:
                 print(f"{Color.RED}篡改检测完成，但保存结果失败{Color.RESET}")
     
-    return global_state["results"]
+    return save_path
+
+def save_parent_base_content(url, config, include_children):
+    """探活父链接并保存其基准内容，返回(是否保存成功, 待保存基准的一级子链接列表)"""
+    # 进行协议补全和探活
+    url_check = complete_and_check_url(url, config["timeout"])
+    if not url_check['best_url']:
+        log(f"URL无法访问，无法保存基准内容: {url}", url, "warning")
+        return False, []
+        
+    page_data = url_check['https'] if url_check['https'] else url_check['http']
+    
+    # 写入基准内容库，带错误处理
+    try:
+        save_base_content(url_check['best_url'], page_data["content"], config)
+    except Exception as e:
+        log(f"写入基准内容失败: {str(e)}", url, "error")
+        return False, []
+    log(f"已保存基准内容 (HTTP: {url_check['http_status']}, HTTPS: {url_check['https_status']}) IP: {', '.join(url_check['ip_addresses']) or '未知'}", url, "success")
+    
+    # 如果需要，同时保存一级子链接的基准内容
+    child_links = []
+    if include_children:
+        try:
+            # 限制子链接数量(凑够数量即停止解析)
+            max_children = 10
+            child_links = extract_links_from_tags(page_data["content"], page_data["final_url"], limit=max_children)
+        except Exception as e:
+            log(f"处理子链接基准内容失败: {str(e)}", url, "warning")
+    return True, child_links
+
+def save_child_base_content(child_link, parent_url, config):
+    """探活一级子链接并保存其基准内容，返回是否保存成功"""
+    try:
+        # 对子链接进行协议补全和探活
+        child_url_check = complete_and_check_url(child_link["absolute_link"], config["timeout"])
+        if not child_url_check['best_url']:
+            log(f"子链接无法访问，无法保存基准内容: {child_link['absolute_link']}", parent_url, "warning")
+            return False
+            
+        child_data = child_url_check['https'] if child_url_check['https'] else child_url_check['http']
+        save_base_content(child_url_check['best_url'], child_data["content"], config)
+    except Exception as e:
+        log(f"处理子链接基准内容失败: {str(e)}", parent_url, "warning")
+        return False
+    log(f"已保存子链接基准内容 IP: {', '.join(child_url_check['ip_addresses']) or '未知'}", child_link["absolute_link"], "success")
+    return True
 
 def init_base_contents(urls, config, include_children=True):
     """初始化基准内容，包括父链接和一级子链接，用于后续篡改检测"""
@@ -1730,6 +2657,7 @@ def init_base_contents(urls, config, include_children=True):
     
     if not ensure_directory_exists(os.path.join(BASE_CONTENTS_DIR, "test.tmp")):
         print(f"{Color.YELLOW}基准内容目录不可写，尝试使用用户主目录{Color.RESET}")
+        close_base_db()
         BASE_CONTENTS_DIR = os.path.join(os.path.expanduser("~"), "darkscan_base_contents")
         if not ensure_directory_exists(os.path.join(BASE_CONTENTS_DIR, "test.tmp")):
             print(f"{Color.RED}无法创建基准内容目录，初始化失败{Color.RESET}")
@@ -1741,117 +2669,86 @@ def init_base_contents(urls, config, include_children=True):
     
     print(f"{Color.CYAN}开始初始化 {len(urls)} 个URL的基准内容（包括父链接和一级子链接）...{Color.RESET}")
     
-    # 进度显示
+    # 进度显示：最多每0.1秒刷新一次(最后一个总会显示)，避免URL很多时频繁写终端
+    last_print = [0.0]
     def print_progress(current, total, url):
+        now = time.monotonic()
+        if now - last_print[0] < 0.1 and current != total:
+            return
+        last_print[0] = now
         progress = (current / total) * 100 if total > 0 else 0
         bar_length = 30
         filled_length = int(bar_length * progress / 100)
         progress_bar = f"{'#' * filled_length}{'-' * (bar_length - filled_length)}"
-        print(f"\r{Color.BOLD}初始化进度: {current}/{total} ({progress:.1f}%) [{progress_bar}] {Color.RESET} 当前: {url[:50]}", end="")
-    
-    # 处理父链接
-    for i, url in enumerate(urls, 1):
-        print_progress(i, total_count, url)
+        sys.stdout.write(f"\r{Color.BOLD}初始化进度: {current}/{total} ({progress:.1f}%) [{progress_bar}] {Color.RESET} 当前: {url[:50]}")
+        sys.stdout.flush()
+    
+    # 父链接和子链接的探活、保存都提交到同一个线程池并发执行；
+    # 父链接完成后由当前线程把它的子链接提交进去，不在工作线程里等待子链接
+    parents_done = 0
+    with ThreadPoolExecutor(max_workers=config["default_threads"]) as executor:
+        # 待完成任务 -> (是否父链接, 父链接URL)
+        pending = {executor.submit(save_parent_base_content, url, config, include_children): (True, url) for url in urls}
         
-        try:
-            # 进行协议补全和探活
-            url_check = complete_and_check_url(url, config["timeout"])
-            if not url_check['best_url']:
-                log(f"URL无法访问，无法保存基准内容: {url}", url, "warning")
-                continue
-                
-            page_data = url_check['https'] if url_check['https'] else url_check['http']
-            
-            parsed_url = urlparse(url_check['best_url'])
-            filename = f"{parsed_url.netloc.replace(':', '_')}_{hash(url_check['best_url'])}.html"  # 使用哈希确保唯一性
-            file_path = os.path.join(BASE_CONTENTS_DIR, filename)
-            
-            # 尝试写入文件，带错误处理
-            try:
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(page_data["content"])
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                is_parent, url = pending.pop(future)
+                try:
+                    saved, child_links = future.result() if is_parent else (future.result(), [])
+                except Exception as e:
+                    log(f"初始化基准内容失败: {str(e)}", url, "error")
+                    saved, child_links = False, []
                 
-                # 验证写入成功
-                if os.path.exists(file_path) and os.path.getsize(file_path) > 0:
+                if saved:
                     success_count += 1
-                    log(f"已保存基准内容 (HTTP: {url_check['http_status']}, HTTPS: {url_check['https_status']}) IP: {', '.join(url_check['ip_addresses']) or '未知'}", url, "success")
-                    
-                    # 如果需要，同时保存一级子链接的基准内容
-                    if include_children:
-                        try:
-                            soup = BeautifulSoup(page_data["content"], "html.parser")
-                            child_links = extract_links_from_tags(soup, page_data["final_url"])
-                            
-                            # 限制子链接数量
-                            max_children = 10
-                            child_links = child_links[:max_children]
-                            child_count += len(child_links)
-                            
-                            # 为每个子链接保存基准内容
-                            for child_link in child_links:
-                                # 对子链接进行协议补全和探活
-                                child_url_check = complete_and_check_url(child_link["absolute_link"], config["timeout"])
-                                if not child_url_check['best_url']:
-                                    log(f"子链接无法访问，无法保存基准内容: {child_link['absolute_link']}", url, "warning")
-                                    continue
-                                    
-                                child_data = child_url_check['https'] if child_url_check['https'] else child_url_check['http']
-                                child_filename = f"child_{hash(child_url_check['best_url'])}.html"
-                                child_file_path = os.path.join(BASE_CONTENTS_DIR, child_filename)
-                                
-                                with open(child_file_path, 'w', encoding='utf-8') as f:
-                                    f.write(child_data["content"])
-                                
-                                if os.path.exists(child_file_path) and os.path.getsize(child_file_path) > 0:
-                                    success_count += 1
-                                    log(f"已保存子链接基准内容 IP: {', '.join(child_url_check['ip_addresses']) or '未知'}", child_link["absolute_link"], "success")
-                        except Exception as e:
-                            log(f"处理子链接基准内容失败: {str(e)}", url, "warning")
-            except Exception as e:
-                log(f"写入基准内容失败: {str(e)}", url, "error")
-        except Exception as e:
-            log(f"初始化基准内容失败: {str(e)}", url, "error")
+                if is_parent:
+                    parents_done += 1
+                    print_progress(parents_done, total_count, url)
+                
+                child_count += len(child_links)
+                for child_link in child_links:
+                    pending[executor.submit(save_child_base_content, child_link, url, config)] = (False, url)
     
+    commit_base_db()
+    flush_logs()
     print()  # 换行
     total_processed = total_count + child_count
     print(f"{Color.GREEN}基准内容初始化完成，成功 {success_count}/{total_processed} (父链接: {len(urls)}, 子链接: {child_count}){Color.RESET}")
     return success_count
 
+# 查看历史记录时预览读取的字节数
+HISTORY_PREVIEW_BYTES = 64 * 1024
+
 def view_scan_history():
     """查看扫描历史，包括篡改检测结果"""
     all_files = []
     
-    # 收集扫描结果
-    if os.path.exists(SCAN_RESULTS_DIR):
-        for fname in os.listdir(SCAN_RESULTS_DIR):
-            if fname.endswith(".csv"):
-                fpath = os.path.join(SCAN_RESULTS_DIR, fname)
-                ftime = os.path.getctime(fpath)
-                all_files.append((-ftime, "扫描", fname, fpath))
-    
-    # 收集篡改检测结果
-    if os.path.exists(TAMPER_RESULTS_DIR):
-        for fname in os.listdir(TAMPER_RESULTS_DIR):
-            if fname.endswith(".csv"):
-                fpath = os.path.join(TAMPER_RESULTS_DIR, fname)
-                ftime = os.path.getctime(fpath)
-                all_files.append((-ftime, "篡改检测", fname, fpath))
+    # 收集扫描结果和篡改检测结果：scandir一次遍历，目录项自带的stat结果同时提供创建时间和大小
+    for results_dir, type_name in ((SCAN_RESULTS_DIR, "扫描"), (TAMPER_RESULTS_DIR, "篡改检测")):
+        try:
+            with os.scandir(results_dir) as entries:
+                for entry in entries:
+                    if entry.name.endswith(".csv"):
+                        try:
+                            stat = entry.stat()
+                        except OSError:
+                            continue
+                        all_files.append((stat.st_ctime, type_name, entry.name, entry.path, stat.st_size))
+        except FileNotFoundError:
+            continue
     
     if not all_files:
         print(f"{Color.YELLOW}暂无扫描历史记录{Color.RESET}")
         return
     
     print(f"\n{Color.BOLD}===== 历史记录 ====={Color.RESET}")
-    all_files.sort()
+    # 只显示最近10条记录，不需要对全部记录排序
+    all_files = heapq.nlargest(10, all_files, key=lambda item: item[0])
     
-    # 显示最近10条记录
-    for i, (_, type_name, fname, fpath) in enumerate(all_files[:10], 1):
-        try:
-            fsize = os.path.getsize(fpath) / 1024
-            fdate = datetime.fromtimestamp(os.path.getctime(fpath)).strftime('%Y-%m-%d %H:%M')
-            print(f"{Color.GREEN}{i}. {Color.RESET}[{type_name}] {fname} ({fsize:.1f}KB) - {fdate}")
-        except:
-            print(f"{Color.GREEN}{i}. {Color.RESET}[{type_name}] {fname} (无法访问)")
+    for i, (ctime, type_name, fname, fpath, fsize) in enumerate(all_files, 1):
+        fdate = datetime.fromtimestamp(ctime).strftime('%Y-%m-%d %H:%M')
+        print(f"{Color.GREEN}{i}. {Color.RESET}[{type_name}] {fname} ({fsize / 1024:.1f}KB) - {fdate}")
     
     try:
         choice = input(f"\n{Color.YELLOW}请输入要查看的记录编号 (0返回): {Color.RESET}").strip()
@@ -1859,24 +2756,26 @@ def view_scan_history():
             return
             
         idx = int(choice) - 1
-        if 0 <= idx < len(all_files[:10]):
-            _, type_name, fname, fpath = all_files[idx]
+        if 0 <= idx < len(all_files):
+            _, type_name, fname, fpath, _ = all_files[idx]
             print(f"\n{Color.BOLD}查看{type_name}记录: {fname}{Color.RESET}")
             print(f"{Color.CYAN}{'-'*60}{Color.RESET}")
             
             try:
-                with open(fpath, 'r', encoding='utf-8-sig') as f:
-                    reader = csv.reader(f)
-                    headers = next(reader)
-                    print(f"{Color.BOLD}{', '.join(headers[:8]) + '...'}{Color.RESET}")
-                    
-                    count = 0
-                    for row in reader:
-                        if count >= 5:
-                            print("...")
-                            break
-                        print(", ".join(row[:8]) + "...")
-                        count += 1
+                # 只预览表头和前5行，读取文件开头一段即可，不随文件大小增长
+                with open(fpath, 'rb') as f:
+                    head = f.read(HISTORY_PREVIEW_BYTES)
+                reader = csv.reader(io.StringIO(head.decode('utf-8-sig', errors='replace')))
+                headers = next(reader)
+                print(f"{Color.BOLD}{', '.join(headers[:8]) + '...'}{Color.RESET}")
+                
+                count = 0
+                for row in reader:
+                    if count >= 5:
+                        print("...")
+                        break
+                    print(", ".join(row[:8]) + "...")
+                    count += 1
             except Exception as e:
                 print(f"{Color.RED}读取记录文件失败: {str(e)}{Color.RESET}")
                 print(f"文件路径: {fpath}")
@@ -1888,6 +2787,7 @@ def view_scan_history():
 
 def setup_scheduled_scan(config):
     """设置定时扫描，篡改检测针对父链接和一级子链接"""
+    import schedule
     print(f"\n{Color.BOLD}===== 定时扫描设置 ====={Color.RESET}")
     print(f"{Color.GREEN}1. {Color.RESET}定时暗链扫描")
     print(f"{Color.GREEN}2. {Color.RESET}定时暗链扫描 + 篡改检测(父链接和一级子链接)")
@@ -1921,9 +2821,9 @@ def setup_scheduled_scan(config):
             
             def scheduled_link_scan():
                 print(f"\n{Color.BOLD}===== 定时暗链扫描开始 ({datetime.now().strftime('%Y-%m-%d %H:%M:%S')}) ====={Color.RESET}")
-                urls = load_urls_from_file()
+                urls, rules = load_urls_and_rules(config)
                 if urls:
-                    run_batch_scan(urls, config["max_depth"], config, False)
+                    run_batch_scan(urls, config["max_depth"], config, False, rules=rules)
                 else:
                     print(f"{Color.YELLOW}未找到有效的URL，定时扫描取消{Color.RESET}")
             
@@ -1952,9 +2852,9 @@ def setup_scheduled_scan(config):
             
             def scheduled_combined_scan():
                 print(f"\n{Color.BOLD}===== 定时组合扫描开始 ({datetime.now().strftime('%Y-%m-%d %H:%M:%S')}) ====={Color.RESET}")
-                urls = load_urls_from_file()
+                urls, rules = load_urls_and_rules(config)
                 if urls:
-                    run_batch_scan(urls, 1, config, True)  # 快速扫描+篡改检测(父链接和一级子链接)
+                    run_batch_scan(urls, 1, config, True, rules=rules)  # 快速扫描+篡改检测(父链接和一级子链接)
                 else:
                     print(f"{Color.YELLOW}未找到有效的URL，定时扫描取消{Color.RESET}")
             
@@ -1995,9 +2895,14 @@ def setup_scheduled_scan(config):
         print(f"{Color.YELLOW}提示: 请保持程序运行以启用定时功能{Color.RESET}")
         
         try:
+            # 按距下一次任务的时间休眠，到点即执行，不再固定每60秒轮询一次
             while True:
                 schedule.run_pending()
-                time.sleep(60)
+                delay = schedule.idle_seconds()
+                if delay is None:
+                    break
+                if delay > 0:
+                    time.sleep(min(delay, 60))
         except KeyboardInterrupt:
             print(f"\n{Color.GREEN}用户中断，定时任务停止{Color.RESET}")
             
@@ -2024,6 +2929,7 @@ def main():
     
     print_darkscan_banner()
     config = load_config()
+    init_probe_pool(config["default_threads"])
     
     while True:
         try:
@@ -2032,31 +2938,24 @@ def main():
                 continue
             
             if choice == 0:
+                for pool in (probe_pool, link_pool):
+                    if pool:
+                        pool.shutdown(wait=False)
+                shutdown_parse_pool()
+                close_base_db()
                 print(f"{Color.GREEN}感谢使用，再见！{Color.RESET}")
                 break
             
             elif choice == 1:
                 # 快速扫描 + 篡改检测(父链接和一级子链接)
-                urls = load_urls_from_file()
+                urls, rules = load_urls_and_rules(config)
                 if urls:
                     # 检查是否有基准内容
-                    has_base_content = False
-                    # 对每个URL进行协议补全后检查
-                    for url in urls:
-                        url_check = complete_and_check_url(url, config["timeout"])
-                        if url_check['best_url']:
-                            parsed_url = urlparse(url_check['best_url'])
-                            filename = f"{parsed_url.netloc.replace(':', '_')}_{hash(url_check['best_url'])}.html"
-                            base_path = os.path.join(BASE_CONTENTS_DIR, filename)
-                            if os.path.exists(base_path):
-                                has_base_content = True
-                                break
-                            
-                    if not has_base_content:
+                    if not has_any_base_content(urls, config):
                         print(f"{Color.YELLOW}未找到基准内容，将先初始化基准内容再进行扫描{Color.RESET}")
                         init_base_contents(urls, config)
                         
-                    run_batch_scan(urls, max_depth=1, config=config, perform_tamper_check=True)
+                    run_batch_scan(urls, max_depth=1, config=config, perform_tamper_check=True, rules=rules)
             
             elif choice == 2:
                 # 深度扫描
@@ -2069,9 +2968,9 @@ def main():
                     print(f"{Color.RED}请输入有效的数字{Color.RESET}")
                     continue
                 
-                urls = load_urls_from_file()
+                urls, rules = load_urls_and_rules(config)
                 if urls:
-                    run_batch_scan(urls, max_depth=depth, config=config, perform_tamper_check=False)
+                    run_batch_scan(urls, max_depth=depth, config=config, perform_tamper_check=False, rules=rules)
             
             elif choice == 3:
                 # 初始化基准内容(父链接和一级子链接)
@@ -2084,19 +2983,7 @@ def main():
                 urls = load_urls_from_file()
                 if urls:
                     # 检查是否有基准内容
-                    has_base_content = False
-                    # 对每个URL进行协议补全后检查
-                    for url in urls:
-                        url_check = complete_and_check_url(url, config["timeout"])
-                        if url_check['best_url']:
-                            parsed_url = urlparse(url_check['best_url'])
-                            filename = f"{parsed_url.netloc.replace(':', '_')}_{hash(url_check['best_url'])}.html"
-                            base_path = os.path.join(BASE_CONTENTS_DIR, filename)
-                            if os.path.exists(base_path):
-                                has_base_content = True
-                                break
-                        
-                    if not has_base_content:
+                    if not has_any_base_content(urls, config):
                         print(f"{Color.YELLOW}未找到基准内容，将先初始化基准内容再进行检测{Color.RESET}")
                         init_base_contents(urls, config)
                         
@@ -2123,6 +3010,7 @@ def main():
                         if 1 <= threads <= 20:
                             config['default_threads'] = threads
                             save_config(config)
+                            init_probe_pool(threads)
                         else:
                             print(f"{Color.RED}线程数必须在1-20之间{Color.RESET}")
                             
@@ -2192,7 +3080,9 @@ def main():
                     else:
                         print(f"{Color.YELLOW}规则文件已存在{Color.RESET}")
                         
-                    # 立即加载规则
+                    # 立即加载规则，清空旧的规则缓存和正则合并缓存
+                    loaded_rules_cache.clear()
+                    compiled_rules_cache.clear()
                     load_rules(config)
                 else:
                     print(f"{Color.RED}规则文件不存在或无法访问{Color.RESET}")
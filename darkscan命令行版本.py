@@ -7,6 +7,7 @@ import threading
 import signal
 import shutil
 import subprocess
+import selectors
 import time  # 添加time模块导入
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
@@ -20,8 +21,7 @@ sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 def install_missing_dependencies():
     required_packages = {
         "requests": "requests",
-        "bs4": "beautifulsoup4",
-        "schedule": "schedule"
+        "bs4": "beautifulsoup4"
     }
     
     missing = []
@@ -55,7 +55,6 @@ install_missing_dependencies()
 # 现在导入需要的库
 import requests
 from bs4 import BeautifulSoup
-import schedule
 
 # 获取脚本所在目录
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -67,6 +66,14 @@ RULES_DIR = os.path.join(SCRIPT_DIR, "rules")
 SCAN_RESULTS_DIR = os.path.join(SCRIPT_DIR, "scan_results")
 BASE_CONTENTS_DIR = os.path.join(SCRIPT_DIR, "base_contents")
 
+# 定时扫描交给系统调度(Linux: systemd用户定时器, macOS: launchd, Windows: 任务计划)，
+# 到点以 --scheduled-run 参数启动本脚本执行一次扫描后退出，两次扫描之间不需要常驻进程
+SCHEDULED_RUN_FLAG = "--scheduled-run"
+SCHEDULE_TASK_NAME = "darkscan"
+SYSTEMD_USER_DIR = os.path.join(os.path.expanduser("~"), ".config", "systemd", "user")
+LAUNCHD_LABEL = "com.darkscan.scheduled-scan"
+LAUNCHD_PLIST_PATH = os.path.join(os.path.expanduser("~"), "Library", "LaunchAgents", f"{LAUNCHD_LABEL}.plist")
+
 # 全局状态跟踪与锁
 global_state = {
     "is_terminated": False,
@@ -834,6 +841,9 @@ def init_base_contents(urls, config):
     print(f"基准内容初始化完成，成功 {success_count}/{len(urls)}")
     return success_count
 
+# 查看历史记录时预览读取的字节数
+HISTORY_PREVIEW_BYTES = 64 * 1024
+
 def view_scan_history():
     """查看扫描历史"""
     if not os.path.exists(SCAN_RESULTS_DIR) or not os.listdir(SCAN_RESULTS_DIR):
@@ -841,21 +851,21 @@ def view_scan_history():
         return
     
     print("\n===== 扫描历史 =====")
-    # 获取并按时间排序所有结果文件
+    # 获取并按时间排序所有结果文件：scandir一次遍历，目录项自带的stat结果同时提供创建时间和大小
     files = []
-    for fname in os.listdir(SCAN_RESULTS_DIR):
-        if fname.endswith(".csv"):
-            fpath = os.path.join(SCAN_RESULTS_DIR, fname)
-            ftime = os.path.getctime(fpath)
-            files.append((-ftime, fname, fpath))  # 负号用于倒序排序
+    with os.scandir(SCAN_RESULTS_DIR) as entries:
+        for entry in entries:
+            if entry.name.endswith(".csv"):
+                st = entry.stat()
+                files.append((-st.st_ctime, entry.name, entry.path, st.st_size))  # 负号用于倒序排序
     
     # 按时间倒序排列
     files.sort()
     
     # 显示最近10条记录
-    for i, (_, fname, fpath) in enumerate(files[:10], 1):
-        fsize = os.path.getsize(fpath) / 1024  # KB
-        fdate = datetime.fromtimestamp(os.path.getctime(fpath)).strftime('%Y-%m-%d %H:%M')
+    for i, (neg_ctime, fname, fpath, size) in enumerate(files[:10], 1):
+        fsize = size / 1024  # KB
+        fdate = datetime.fromtimestamp(-neg_ctime).strftime('%Y-%m-%d %H:%M')
         print(f"{i}. {fname} ({fsize:.1f}KB) - {fdate}")
     
     # 允许查看特定记录详情
@@ -866,29 +876,197 @@ def view_scan_history():
             
         idx = int(choice) - 1
         if 0 <= idx < len(files[:10]):
-            _, fname, fpath = files[idx]
+            _, fname, fpath, _ = files[idx]
             print(f"\n查看记录: {fname}")
             print("-"*60)
             
-            # 读取并显示前5条记录
-            with open(fpath, 'r', encoding='utf-8-sig') as f:
-                reader = csv.reader(f)
-                headers = next(reader)  # 表头
-                print(", ".join(headers[:5]) + "...")  # 只显示部分表头
-                
-                count = 0
-                for row in reader:
-                    if count >= 5:  # 只显示前5条
-                        print("...")
-                        break
-                    print(", ".join(row[:5]) + "...")  # 只显示部分内容
-                    count += 1
+            # 读取并显示前5条记录：只读取文件开头一段，不随文件大小增长
+            with open(fpath, 'rb') as f:
+                head = f.read(HISTORY_PREVIEW_BYTES)
+            reader = csv.reader(io.StringIO(head.decode('utf-8-sig', errors='replace')))
+            headers = next(reader)  # 表头
+            print(", ".join(headers[:5]) + "...")  # 只显示部分表头
+            
+            count = 0
+            for row in reader:
+                if count >= 5:  # 只显示前5条
+                    print("...")
+                    break
+                print(", ".join(row[:5]) + "...")  # 只显示部分内容
+                count += 1
             
             print("-"*60)
             print(f"文件路径: {fpath}")
     except (ValueError, IndexError):
         print("无效的选择")
 
+def scheduled_job(config):
+    """执行一次定时扫描"""
+    print(f"\n===== 定时扫描开始 ({datetime.now().strftime('%Y-%m-%d %H:%M:%S')}) =====")
+    urls = load_urls_from_file()
+    if urls:
+        run_batch_scan(urls, config["max_depth"], config)
+    else:
+        print("未找到有效的URL，定时扫描取消")
+
+def scheduled_run_command():
+    """系统定时任务执行的命令: 当前解释器 + 本脚本 + --scheduled-run"""
+    return [sys.executable, os.path.abspath(__file__), SCHEDULED_RUN_FLAG]
+
+def run_schedule_command(args):
+    """执行注册/删除定时任务的系统命令，返回是否成功"""
+    try:
+        subprocess.run(args, check=True, capture_output=True, timeout=30)
+        return True
+    except (OSError, subprocess.SubprocessError) as e:
+        print(f"执行 {' '.join(args)} 失败: {str(e)}")
+        return False
+
+def systemd_quote(arg):
+    """把一个命令行参数转义为systemd ExecStart中的带引号参数
+
+    ExecStart会展开%说明符和$变量，并对引号、反斜杠做特殊处理，所以始终加引号并转义这些字符
+    """
+    escaped = arg.replace("\\", "\\\\").replace('"', '\\"').replace("%", "%%").replace("$", "$$")
+    return f'"{escaped}"'
+
+def systemd_unit_paths():
+    """systemd用户定时任务的.service和.timer文件路径"""
+    return (os.path.join(SYSTEMD_USER_DIR, f"{SCHEDULE_TASK_NAME}.service"),
+            os.path.join(SYSTEMD_USER_DIR, f"{SCHEDULE_TASK_NAME}.timer"))
+
+def remove_systemd_unit_files():
+    """删除写入的systemd单元文件(不存在时忽略)"""
+    for path in systemd_unit_paths():
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+def systemd_linger_enabled():
+    """当前用户是否开启了lingering(未登录时用户定时器也继续运行)，无法判断时返回None"""
+    try:
+        output = subprocess.run(
+            ["loginctl", "show-user", str(os.getuid()), "--property=Linger"],
+            check=True, capture_output=True, text=True, timeout=10
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return output == "Linger=yes"
+
+def install_system_schedule(interval):
+    """把定时扫描注册为系统定时任务，每interval分钟执行一次，返回是否成功"""
+    command = scheduled_run_command()
+    try:
+        if sys.platform.startswith('win32'):
+            task_command = subprocess.list2cmdline(command)
+            return run_schedule_command([
+                "schtasks", "/Create", "/F", "/SC", "MINUTE", "/MO", str(interval),
+                "/TN", SCHEDULE_TASK_NAME, "/TR", task_command
+            ])
+        
+        if sys.platform == 'darwin':
+            import plistlib
+            os.makedirs(os.path.dirname(LAUNCHD_PLIST_PATH), exist_ok=True)
+            with open(LAUNCHD_PLIST_PATH, 'wb') as f:
+                plistlib.dump({
+                    "Label": LAUNCHD_LABEL,
+                    "ProgramArguments": command,
+                    "WorkingDirectory": SCRIPT_DIR,
+                    "StartInterval": interval * 60,
+                    "RunAtLoad": True
+                }, f)
+            # 已加载过的旧任务先卸载，失败(未加载)可以忽略
+            subprocess.run(["launchctl", "unload", LAUNCHD_PLIST_PATH], capture_output=True)
+            return run_schedule_command(["launchctl", "load", LAUNCHD_PLIST_PATH])
+        
+        service_path, timer_path = systemd_unit_paths()
+        os.makedirs(SYSTEMD_USER_DIR, exist_ok=True)
+        with open(service_path, 'w', encoding='utf-8') as f:
+            f.write("[Unit]\n")
+            f.write("Description=DarkScan scheduled scan\n\n")
+            f.write("[Service]\n")
+            f.write("Type=oneshot\n")
+            # WorkingDirectory同样会展开%说明符(不支持引号)
+            f.write(f"WorkingDirectory={SCRIPT_DIR.replace('%', '%%')}\n")
+            exec_start = " ".join(systemd_quote(arg) for arg in command)
+            f.write(f"ExecStart={exec_start}\n")
+        with open(timer_path, 'w', encoding='utf-8') as f:
+            f.write("[Unit]\n")
+            f.write("Description=DarkScan scheduled scan timer\n\n")
+            f.write("[Timer]\n")
+            f.write("OnActiveSec=0\n")
+            f.write(f"OnUnitActiveSec={interval}min\n\n")
+            f.write("[Install]\n")
+            f.write("WantedBy=timers.target\n")
+        if (run_schedule_command(["systemctl", "--user", "daemon-reload"])
+                and run_schedule_command(["systemctl", "--user", "enable", "--now", f"{SCHEDULE_TASK_NAME}.timer"])):
+            return True
+        # 没有用户级systemd(容器、WSL、SSH会话等)时不留下无用的单元文件
+        remove_systemd_unit_files()
+        return False
+    except Exception as e:
+        print(f"注册系统定时任务失败: {str(e)}")
+        if not sys.platform.startswith('win32') and sys.platform != 'darwin':
+            try:
+                remove_systemd_unit_files()
+            except OSError:
+                pass
+        return False
+
+def remove_system_schedule():
+    """删除已注册的系统定时任务(不存在时忽略)"""
+    try:
+        if sys.platform.startswith('win32'):
+            subprocess.run(["schtasks", "/Delete", "/F", "/TN", SCHEDULE_TASK_NAME], capture_output=True)
+        elif sys.platform == 'darwin':
+            if os.path.exists(LAUNCHD_PLIST_PATH):
+                subprocess.run(["launchctl", "unload", LAUNCHD_PLIST_PATH], capture_output=True)
+                os.remove(LAUNCHD_PLIST_PATH)
+        else:
+            _, timer_path = systemd_unit_paths()
+            if os.path.exists(timer_path):
+                subprocess.run(["systemctl", "--user", "disable", "--now", f"{SCHEDULE_TASK_NAME}.timer"], capture_output=True)
+                remove_systemd_unit_files()
+                subprocess.run(["systemctl", "--user", "daemon-reload"], capture_output=True)
+    except Exception as e:
+        print(f"删除系统定时任务失败: {str(e)}")
+
+def wait_next_run(seconds):
+    """等待到下一次定时扫描，期间同时监听标准输入；用户输入q时返回True
+    
+    用selector在stdin可读和到点之间等待，不再整段sleep；Windows的select不支持控制台输入，改为按秒分段等待
+    """
+    deadline = time.monotonic() + seconds
+    selector = None
+    if sys.platform != "win32" and sys.stdin is not None:
+        selector = selectors.DefaultSelector()
+        try:
+            selector.register(sys.stdin, selectors.EVENT_READ)
+        except (ValueError, OSError):
+            # 标准输入是普通文件等无法监听的对象
+            selector.close()
+            selector = None
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            if selector is None:
+                time.sleep(min(remaining, 1))
+                continue
+            if selector.select(min(remaining, 60)):
+                line = sys.stdin.readline()
+                if not line:
+                    # 标准输入已关闭，之后只按时间等待
+                    selector.close()
+                    selector = None
+                elif line.strip().lower() == "q":
+                    return True
+    finally:
+        if selector is not None:
+            selector.close()
+
 def setup_scheduled_scan(config):
     """设置定时扫描"""
     print("\n===== 定时扫描设置 =====")
@@ -903,6 +1081,7 @@ def setup_scheduled_scan(config):
         if interval == 0:
             config["schedule_interval"] = 0
             save_config(config)
+            remove_system_schedule()
             print("已取消定时扫描")
             return
             
@@ -913,27 +1092,33 @@ def setup_scheduled_scan(config):
         config["schedule_interval"] = interval
         save_config(config)
         
-        # 显示定时扫描信息
-        print(f"定时扫描已设置为每 {interval} 分钟一次")
-        print("提示: 请保持程序运行以启用定时扫描功能")
-        
-        # 启动定时任务
-        def scheduled_job():
-            print(f"\n===== 定时扫描开始 ({datetime.now().strftime('%Y-%m-%d %H:%M:%S')}) =====")
-            urls = load_urls_from_file()
-            if urls:
-                run_batch_scan(urls, config["max_depth"], config)
+        # 优先注册系统定时任务，程序可以直接退出
+        if install_system_schedule(interval):
+            print(f"定时扫描已注册为系统定时任务，每 {interval} 分钟执行一次")
+            if sys.platform.startswith('win32') or sys.platform == 'darwin':
+                print("提示: 无需保持程序运行")
+            elif systemd_linger_enabled():
+                print("提示: 无需保持程序运行，已开启lingering，注销后定时扫描仍会继续")
             else:
-                print("未找到有效的URL，定时扫描取消")
+                # systemd用户定时器在用户注销后会停止，除非开启lingering
+                print("提示: 登录期间无需保持程序运行；注销后定时扫描会停止，如需一直运行请执行 loginctl enable-linger")
+            print(f"提示: 也可手动执行 {subprocess.list2cmdline(scheduled_run_command())} 扫描一次")
+            return
+        
+        # 无法注册系统定时任务时，退回到在本进程内定时执行
+        print(f"定时扫描已设置为每 {interval} 分钟一次")
+        print("提示: 未能注册系统定时任务，请保持程序运行以启用定时扫描功能")
         
-        # 立即执行一次，然后按间隔执行
-        scheduled_job()
-        schedule.every(interval).minutes.do(scheduled_job)
+        # 立即执行一次，然后按间隔执行；等待期间输入q回车可停止
+        print("提示: 输入 q 并回车停止定时扫描")
+        scheduled_job(config)
         
         try:
             while True:
-                schedule.run_pending()
-                time.sleep(60)
+                if wait_next_run(interval * 60):
+                    print("定时扫描已停止")
+                    break
+                scheduled_job(config)
         except KeyboardInterrupt:
             print("\n用户中断，定时扫描停止")
             
@@ -1107,7 +1292,12 @@ def main():
 
 if __name__ == "__main__":
     try:
-        main()
+        if SCHEDULED_RUN_FLAG in sys.argv[1:]:
+            # 由系统定时任务启动: 扫描一次后退出(os._exit不会刷新输出缓冲，先手动刷新)
+            scheduled_job(load_config())
+            sys.stdout.flush()
+        else:
+            main()
     except KeyboardInterrupt:
         print("\n用户中断，程序退出")
     except Exception as e:
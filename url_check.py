@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 import os
+import re
 import sys
 import subprocess
 import argparse
@@ -8,10 +9,22 @@ import socket
 import csv
 import time
 import shutil
+import ssl
+import threading
+import asyncio
 from urllib.parse import urlparse
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import logging
-from typing import List, Dict, Optional
+from functools import lru_cache
+from operator import itemgetter
+from typing import List, Dict, Optional, Tuple
+
+# 可选依赖: 安装了httpx和h2时在事件循环中用HTTP/2客户端并发检查，同一主机的请求复用一条连接；否则使用线程池+requests
+try:
+    import httpx
+    import h2  # noqa: F401  httpx的HTTP/2支持依赖h2
+except ImportError:
+    httpx = None
 
 # 工具信息
 TOOL_NAME = "url_check"
@@ -39,10 +52,64 @@ ICONS = {
 DEFAULT_WORKERS = 5
 DEFAULT_TIMEOUT = 10
 CONFIG_FILE = os.path.expanduser("~/.url_check_config")
+# 已解析的配置缓存: {'key': (修改时间, 文件大小), 'values': (并发数, 超时时间)}，配置文件未变化时不再重新读取解析
+CONFIG_CACHE = {}
 
 # 所需依赖
 REQUIRED_PACKAGES = ['requests']
 
+# 请求头，模拟浏览器访问
+REQUEST_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# 查看历史结果时预览读取的字符数(表头加前10行足够)
+HISTORY_PREVIEW_CHARS = 8192
+HISTORY_PREVIEW_LINES = 11
+# 清除历史结果时并发删除文件的线程数
+DELETE_WORKERS = 16
+
+# 检查结果攒批输出: 每批最多行数，以及最长间隔(秒)，保证进度仍能及时显示
+RESULT_LOG_BATCH = 64
+RESULT_LOG_INTERVAL = 0.5
+
+# 2xx/3xx视为可访问，4xx直接判定不可访问；只有405和5xx(多为服务器没有正确实现HEAD)才再用GET确认
+HEAD_RETRY_STATUS = 405
+
+def is_accessible_status(status_code: int) -> bool:
+    """状态码是否表示可访问"""
+    return 200 <= status_code < 400
+
+def needs_get_retry(status_code: int) -> bool:
+    """HEAD请求的结果是否需要用GET再确认一次"""
+    return status_code == HEAD_RETRY_STATUS or 500 <= status_code < 600
+
+# DNS解析失败的主机名 -> 失败时间(time.monotonic())；失败结果只缓存一小段时间，避免临时故障被一直记住
+DNS_NEGATIVE_TTL = 60
+DNS_FAILURES = {}
+# 预解析主机名的线程数；DNS查询很轻，可以比HTTP并发开得更大
+DNS_WORKERS = 64
+
+# 常见URL(http/https + 普通主机名 + 可选端口)的快速匹配，一次正则匹配同时完成校验并取出netloc和主机名；
+# 带用户信息、IPv6地址等少见形式匹配不上，再交给urlparse处理
+URL_PATTERN = re.compile(r'^https?://(([^/\s?#:@\[\]]+)(?::\d+)?)(?=[/?#]|$)', re.IGNORECASE)
+
+# 每个工作线程各自持有一个会话(requests.Session不保证线程安全)，线程内跨URL复用连接和TLS会话
+SESSION_POOL_SIZE = 32
+_thread_local = threading.local()
+
+# 进程内共用的SSL上下文，CA证书只在导入时加载一次，不再每建一个连接就重新创建上下文和加载证书；
+# CA证书的选择与requests一致(环境变量REQUESTS_CA_BUNDLE/CURL_CA_BUNDLE优先，否则certifi)；
+# 不验证证书的上下文只用于证书验证失败后的重试
+CA_BUNDLE = os.environ.get('REQUESTS_CA_BUNDLE') or os.environ.get('CURL_CA_BUNDLE') or requests.certs.where()
+if os.path.isdir(CA_BUNDLE):
+    VERIFIED_SSL_CONTEXT = ssl.create_default_context(capath=CA_BUNDLE)
+else:
+    VERIFIED_SSL_CONTEXT = ssl.create_default_context(cafile=CA_BUNDLE)
+UNVERIFIED_SSL_CONTEXT = ssl.create_default_context()
+UNVERIFIED_SSL_CONTEXT.check_hostname = False
+UNVERIFIED_SSL_CONTEXT.verify_mode = ssl.CERT_NONE
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -50,6 +117,8 @@ logging.basicConfig(
     stream=sys.stdout
 )
 logger = logging.getLogger(TOOL_NAME)
+# httpx会把每个请求记录为INFO日志，屏蔽掉以免刷屏
+logging.getLogger("httpx").setLevel(logging.WARNING)
 
 def print_title():
     """打印工具标题和标识"""
@@ -61,6 +130,11 @@ def print_title():
     print(title)
     print("=" * 70)
 
+def clear_screen():
+    """用ANSI转义序列清屏并把光标移到左上角，不再每次启动cls/clear子进程"""
+    sys.stdout.write('\x1b[2J\x1b[H')
+    sys.stdout.flush()
+
 def print_menu():
     """打印命令菜单"""
     menu = f"""
@@ -78,18 +152,32 @@ def print_menu():
     print(menu)
     print("-" * 70)
 
+def config_file_key() -> Optional[tuple]:
+    """配置文件的(修改时间, 大小)，文件不存在时返回None"""
+    try:
+        st = os.stat(CONFIG_FILE)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
 def load_config():
-    """加载配置文件"""
+    """加载配置文件(文件未变化时直接使用缓存的配置)"""
     global DEFAULT_WORKERS, DEFAULT_TIMEOUT
     try:
-        if os.path.exists(CONFIG_FILE):
-            with open(CONFIG_FILE, 'r') as f:
-                for line in f:
-                    key, value = line.strip().split('=')
-                    if key == 'workers':
-                        DEFAULT_WORKERS = int(value)
-                    elif key == 'timeout':
-                        DEFAULT_TIMEOUT = int(value)
+        key = config_file_key()
+        if key is None:
+            return
+        if CONFIG_CACHE.get('key') == key:
+            DEFAULT_WORKERS, DEFAULT_TIMEOUT = CONFIG_CACHE['values']
+            return
+        
+        with open(CONFIG_FILE, 'r') as f:
+            settings = dict(line.strip().split('=', 1) for line in f.read().splitlines() if '=' in line)
+        workers = int(settings.get('workers', DEFAULT_WORKERS))
+        timeout = int(settings.get('timeout', DEFAULT_TIMEOUT))
+        DEFAULT_WORKERS, DEFAULT_TIMEOUT = workers, timeout
+        CONFIG_CACHE['key'] = key
+        CONFIG_CACHE['values'] = (workers, timeout)
     except Exception as e:
         logger.warning(f"{ICONS['warning']} 加载配置文件失败: {str(e)}")
 
@@ -99,6 +187,9 @@ def save_config():
         with open(CONFIG_FILE, 'w') as f:
             f.write(f"workers={DEFAULT_WORKERS}\n")
             f.write(f"timeout={DEFAULT_TIMEOUT}\n")
+        # 刚写入的内容就是当前配置，直接更新缓存，下次加载不必重新解析
+        CONFIG_CACHE['key'] = config_file_key()
+        CONFIG_CACHE['values'] = (DEFAULT_WORKERS, DEFAULT_TIMEOUT)
         logger.info(f"{ICONS['success']} 配置已保存")
     except Exception as e:
         logger.error(f"{ICONS['error']} 保存配置失败: {str(e)}")
@@ -145,16 +236,53 @@ def check_and_install_dependencies(force_update: bool = False) -> bool:
     
     return True
 
+@lru_cache(maxsize=8192)
+def resolve_hostname(hostname: str) -> str:
+    """解析主机名(成功结果按主机名缓存，解析失败抛出异常，不进入缓存)"""
+    return socket.gethostbyname(hostname)
+
 def get_ip_address(hostname: str) -> Optional[str]:
-    """获取主机名对应的IP地址"""
+    """获取主机名对应的IP地址，同一主机只解析一次，解析失败后DNS_NEGATIVE_TTL秒内不再重试"""
+    failed_at = DNS_FAILURES.get(hostname)
+    if failed_at is not None and time.monotonic() - failed_at < DNS_NEGATIVE_TTL:
+        return None
     try:
-        ip_address = socket.gethostbyname(hostname)
-        return ip_address
-    except (socket.gaierror, Exception):
+        ip_address = resolve_hostname(hostname)
+    except (OSError, UnicodeError):
+        # OSError包括socket.gaierror；标签过长或非法的主机名在IDNA编码时抛出UnicodeError
+        DNS_FAILURES[hostname] = time.monotonic()
+        return None
+    DNS_FAILURES.pop(hostname, None)
+    return ip_address
+
+def split_url_host(url: str) -> Tuple[str, Optional[str]]:
+    """返回URL的(netloc, 小写主机名)，与urlparse的netloc/hostname一致"""
+    match = URL_PATTERN.match(url)
+    if match:
+        return match.group(1), match.group(2).lower()
+    parsed = urlparse(url)
+    return parsed.netloc, parsed.hostname
+
+def preresolve_hostnames(urls: List[str]) -> Dict[str, Optional[str]]:
+    """HTTP检查开始前并发解析所有不重复的主机名，返回 主机名 -> IP(解析失败为None)"""
+    hosts = {split_url_host(url)[1] for url in urls} - {None}
+    if not hosts:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(DNS_WORKERS, len(hosts))) as executor:
+        return dict(zip(hosts, executor.map(get_ip_address, hosts)))
+
+def lookup_ip(hostname: Optional[str], ip_map: Optional[Dict[str, Optional[str]]] = None) -> Optional[str]:
+    """优先从预解析结果中取IP，没有预解析过的主机再现场解析"""
+    if not hostname:
         return None
+    if ip_map is not None and hostname in ip_map:
+        return ip_map[hostname]
+    return get_ip_address(hostname)
 
 def is_valid_url(url: str) -> bool:
     """检查URL是否有效并包含http/https协议"""
+    if URL_PATTERN.match(url):
+        return True
     try:
         result = urlparse(url)
         return all([result.scheme, result.netloc]) and result.scheme in ['http', 'https']
@@ -162,28 +290,67 @@ def is_valid_url(url: str) -> bool:
         return False
 
 def add_protocol_if_missing(url: str) -> Optional[str]:
-    """如果URL缺少协议，尝试添加http://和https://并检查哪个有效"""
+    """如果URL缺少协议，补上https://；已带http/https协议的URL直接返回"""
     if not url:
         return None
+    # 绝大多数URL已带协议，正则匹配成功即可直接返回，不必解析
+    if URL_PATTERN.match(url):
+        return url
+    if url.startswith(('http://', 'https://')):
+        return url if is_valid_url(url) else None
         
     parsed = urlparse(url)
     if not parsed.scheme:
-        # 尝试添加http和https，优先https
-        for scheme in ['https', 'http']:
-            test_url = f"{scheme}://{url}"
-            if is_valid_url(test_url):
-                return test_url
-        return None
+        # http和https能否通过校验只取决于主机部分，只需试一次https
+        test_url = f"https://{url}"
+        return test_url if is_valid_url(test_url) else None
     return url if is_valid_url(url) else None
 
-def check_url(url: str, timeout: int = 10) -> Dict[str, any]:
-    """检查URL是否可访问并返回状态码和IP地址"""
-    # 解析主机名并获取IP
-    parsed_url = urlparse(url)
-    hostname = parsed_url.netloc
-    ip_address = get_ip_address(hostname)
-    
-    result = {
+class SSLContextAdapter(requests.adapters.HTTPAdapter):
+    """使用指定SSL上下文建立HTTPS连接的适配器(ca_bundle为上下文中已加载的CA证书路径)"""
+    
+    def __init__(self, ssl_context: ssl.SSLContext, ca_bundle: Optional[str] = None, **kwargs):
+        # 父类__init__中会调用init_poolmanager，需先保存上下文
+        self.ssl_context = ssl_context
+        self.ca_bundle = ca_bundle
+        super().__init__(**kwargs)
+    
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['ssl_context'] = self.ssl_context
+        return super().init_poolmanager(*args, **kwargs)
+    
+    def cert_verify(self, conn, url, verify, cert):
+        super().cert_verify(conn, url, verify, cert)
+        # 父类会把CA证书路径设到连接池上，urllib3每建一个连接都会对上下文重新加载一次；
+        # 上下文中已加载的证书不再传入，只保留cert_reqs
+        if verify is True or (self.ca_bundle is not None and verify == self.ca_bundle):
+            conn.ca_certs = None
+            conn.ca_cert_dir = None
+
+def create_session(workers: int, insecure: bool = False) -> requests.Session:
+    """创建会话，复用TCP/TLS连接，连接池大小与并发数一致；insecure为True时不验证证书"""
+    session = requests.Session()
+    session.headers.update(REQUEST_HEADERS)
+    if insecure:
+        adapter = SSLContextAdapter(UNVERIFIED_SSL_CONTEXT, pool_connections=workers, pool_maxsize=workers)
+    else:
+        adapter = SSLContextAdapter(VERIFIED_SSL_CONTEXT, CA_BUNDLE, pool_connections=workers, pool_maxsize=workers)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+def get_thread_session(insecure: bool = False) -> requests.Session:
+    """返回当前线程的会话，首次调用时创建；验证证书和不验证证书的会话分开保存"""
+    attr = 'insecure_session' if insecure else 'session'
+    session = getattr(_thread_local, attr, None)
+    if session is None:
+        session = create_session(SESSION_POOL_SIZE, insecure)
+        setattr(_thread_local, attr, session)
+    return session
+
+def new_check_result(url: str, hostname: str, ip_address: Optional[str]) -> Dict[str, any]:
+    """创建单个URL的检查结果(各检查方式共用的结果格式)"""
+    return {
         'original_url': url,
         'hostname': hostname,
         'ip_address': ip_address,
@@ -192,58 +359,187 @@ def check_url(url: str, timeout: int = 10) -> Dict[str, any]:
         'error': None,
         'check_time': time.strftime('%Y-%m-%d %H:%M:%S')
     }
-    
+
+def record_status(result: Dict, status_code: int, verified: bool = True) -> None:
+    """把最终状态码写入结果；verified为False表示是在跳过证书验证后才得到的响应"""
+    result['status_code'] = status_code
+    result['is_accessible'] = is_accessible_status(status_code)
+    if not verified:
+        result['error'] = "SSL证书验证失败"
+
+def is_ssl_error(exc: BaseException) -> bool:
+    """是否为证书/SSL错误；httpx会把SSL错误包装成ConnectError，沿异常链查找原始的ssl.SSLError"""
+    if isinstance(exc, requests.exceptions.SSLError):
+        return True
+    while exc is not None:
+        if isinstance(exc, ssl.SSLError):
+            return True
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+def request_error_message(exc: Exception, timeout: int) -> str:
+    """把请求异常转换为结果中的错误描述"""
+    if isinstance(exc, requests.exceptions.Timeout) or (httpx is not None and isinstance(exc, httpx.TimeoutException)):
+        return f"请求超时({timeout}秒)"
+    if isinstance(exc, requests.exceptions.RequestException) or (httpx is not None and isinstance(exc, httpx.HTTPError)):
+        return str(exc) or type(exc).__name__
+    return f"错误: {str(exc)}"
+
+def check_url(url: str, timeout: int = 10, session: Optional[requests.Session] = None,
+              ip_map: Optional[Dict[str, Optional[str]]] = None) -> Dict[str, any]:
+    """检查URL是否可访问并返回状态码和IP地址(未传入session时使用当前线程的会话，传入ip_map时使用预解析的IP)"""
+    # 解析主机名并获取IP(DNS只解析主机部分，不带端口)
+    hostname, dns_name = split_url_host(url)
+    result = new_check_result(url, hostname, lookup_ip(dns_name, ip_map))
+    
+    http = session or get_thread_session()
     try:
-        # 设置请求头，模拟浏览器访问
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
         # 先尝试HEAD请求，效率更高
-        response = requests.head(
-            url, 
-            timeout=timeout, 
-            allow_redirects=True,
-            headers=headers,
-            verify=True
-        )
+        response = http.head(url, timeout=timeout, allow_redirects=True, headers=REQUEST_HEADERS)
         
-        # 如果HEAD请求失败，尝试GET请求
-        if response.status_code not in [200, 301, 302]:
-            response = requests.get(
-                url, 
-                timeout=timeout, 
-                allow_redirects=True,
-                headers=headers,
-                verify=True
-            )
-            
-        result['status_code'] = response.status_code
-        result['is_accessible'] = response.status_code == 200
+        # HEAD不被支持或服务器出错时再用GET确认，只取状态码，不下载响应体
+        if needs_get_retry(response.status_code):
+            response = http.get(url, timeout=timeout, allow_redirects=True, headers=REQUEST_HEADERS, stream=True)
+            response.close()
+        record_status(result, response.status_code)
         
-    except requests.exceptions.SSLError:
-        # SSL错误时尝试不验证证书
+    except Exception as e:
+        if not is_ssl_error(e):
+            result['error'] = request_error_message(e, timeout)
+            return result
+        # SSL错误时改用不验证证书的会话重试
         try:
-            response = requests.get(
-                url, 
-                timeout=timeout, 
-                allow_redirects=True,
-                headers=headers,
-                verify=False
+            # verify=False需逐次传入: 设置了REQUESTS_CA_BUNDLE等环境变量时会覆盖会话上的verify
+            response = get_thread_session(insecure=True).get(
+                url, timeout=timeout, allow_redirects=True, headers=REQUEST_HEADERS, verify=False, stream=True
             )
-            result['status_code'] = response.status_code
-            result['is_accessible'] = response.status_code == 200
-            result['error'] = "SSL证书验证失败"
+            response.close()
+            record_status(result, response.status_code, verified=False)
         except Exception as e:
             result['error'] = f"SSL错误: {str(e)}"
+        
+    return result
+
+if httpx is not None:
+    async def check_url_http2(client: "httpx.AsyncClient", insecure_client: "httpx.AsyncClient", url: str,
+                              timeout: int = 10, ip_map: Optional[Dict[str, Optional[str]]] = None) -> Dict[str, any]:
+        """check_url的httpx(HTTP/2)版本，结果格式相同；insecure_client仅在证书验证失败时使用"""
+        hostname, dns_name = split_url_host(url)
+        if ip_map is not None and dns_name in ip_map:
+            ip_address = ip_map[dns_name]
+        else:
+            # gethostbyname会阻塞，放到默认线程池执行
+            ip_address = await asyncio.get_running_loop().run_in_executor(None, lookup_ip, dns_name)
+        result = new_check_result(url, hostname, ip_address)
+        
+        try:
+            # 先尝试HEAD请求，效率更高
+            response = await client.head(url, timeout=timeout)
+            
+            # HEAD不被支持或服务器出错时再用GET确认，只取状态码，不读取响应体
+            if needs_get_retry(response.status_code):
+                async with client.stream('GET', url, timeout=timeout) as response:
+                    pass
+            record_status(result, response.status_code)
             
-    except requests.exceptions.RequestException as e:
-        result['error'] = str(e)
+        except Exception as e:
+            if not is_ssl_error(e):
+                result['error'] = request_error_message(e, timeout)
+                return result
+            # SSL错误时改用不验证证书的客户端重试
+            try:
+                async with insecure_client.stream('GET', url, timeout=timeout) as response:
+                    pass
+                record_status(result, response.status_code, verified=False)
+            except Exception as e:
+                result['error'] = f"SSL错误: {str(e)}"
+            
+        return result
+    
+    async def check_urls_http2(urls: List[str], workers: int, timeout: int,
+                               ip_map: Optional[Dict[str, Optional[str]]] = None) -> List[Dict]:
+        """在一个HTTP/2客户端中并发检查全部URL，同时进行的请求不超过workers，结果攒批输出"""
+        results = []
+        limits = httpx.Limits(max_connections=workers * 4, max_keepalive_connections=workers * 2)
+        semaphore = asyncio.Semaphore(workers)
         
-    except Exception as e:
-        result['error'] = f"错误: {str(e)}"
+        async def check_one(url: str) -> Dict:
+            async with semaphore:
+                return await check_url_http2(client, insecure_client, url, timeout, ip_map)
         
-    return result
+        # 与线程池方式共用导入时创建的SSL上下文，两种方式信任的CA证书一致
+        async with httpx.AsyncClient(http2=True, limits=limits, headers=REQUEST_HEADERS,
+                                     follow_redirects=True, timeout=timeout,
+                                     verify=VERIFIED_SSL_CONTEXT) as client, \
+                httpx.AsyncClient(http2=True, limits=limits, headers=REQUEST_HEADERS,
+                                  follow_redirects=True, timeout=timeout,
+                                  verify=UNVERIFIED_SSL_CONTEXT) as insecure_client:
+            with ResultLogBuffer() as result_log:
+                for future in asyncio.as_completed([check_one(url) for url in urls]):
+                    result = await future
+                    results.append(result)
+                    result_log.add(result)
+        return results
+
+def check_urls_threaded(urls: List[str], workers: int, timeout: int,
+                        ip_map: Optional[Dict[str, Optional[str]]] = None) -> List[Dict]:
+    """使用线程池并发检查URL，每个线程复用自己的会话，结果攒批输出"""
+    results = []
+    with ThreadPoolExecutor(max_workers=workers) as executor, ResultLogBuffer() as result_log:
+        # 提交所有任务
+        futures = {executor.submit(check_url, url, timeout, None, ip_map): url for url in urls}
+        
+        # 处理完成的任务
+        for future in as_completed(futures):
+            url = futures[future]
+            try:
+                result = future.result()
+                results.append(result)
+                result_log.add(result)
+            except Exception as e:
+                result_log.flush()
+                logger.error(f"{ICONS['error']} 检查 {url} 时出错: {str(e)}")
+    return results
+
+def format_check_result(result: Dict) -> str:
+    """格式化单个URL的检查结果(一行，含换行符)"""
+    url = result['original_url']
+    # 构建包含IP的状态信息
+    ip_info = f"[{ICONS['ip']} {result['ip_address']}]" if result['ip_address'] else "[IP: 未知]"
+    
+    if result['is_accessible']:
+        return f"{ICONS['success']} {url} {ip_info} - 状态码: {result['status_code']}\n"
+    error_msg = f"状态码: {result['status_code']}" if result['status_code'] else result['error']
+    return f"{ICONS['error']} {url} {ip_info} - {error_msg}\n"
+
+class ResultLogBuffer:
+    """攒批输出检查结果: 满RESULT_LOG_BATCH行或距上次输出超过RESULT_LOG_INTERVAL秒时一次写出，
+    不再每个结果都经过logging并单独写一次stdout；退出with时写出剩余内容"""
+    
+    def __init__(self):
+        self.enabled = logger.isEnabledFor(logging.INFO)
+        self.lines = []
+        self.last_flush = time.monotonic()
+    
+    def add(self, result: Dict) -> None:
+        if not self.enabled:
+            return
+        self.lines.append(format_check_result(result))
+        if len(self.lines) >= RESULT_LOG_BATCH or time.monotonic() - self.last_flush >= RESULT_LOG_INTERVAL:
+            self.flush()
+    
+    def flush(self) -> None:
+        if self.lines:
+            sys.stdout.write(''.join(self.lines))
+            sys.stdout.flush()
+            self.lines.clear()
+        self.last_flush = time.monotonic()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.flush()
 
 def read_urls_from_file(file_path: str) -> List[str]:
     """从文件中读取URL列表"""
@@ -278,11 +574,11 @@ def save_results_to_csv(results: List[Dict], timestamp: str) -> None:
         ]
         
         with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+            writer = csv.writer(csvfile)
             
-            writer.writeheader()
-            for result in results:
-                writer.writerow(result)
+            writer.writerow(fieldnames)
+            # 按列顺序一次取出各字段组成行，由writerows整体写入，不再逐行按字段名查字典
+            writer.writerows(map(itemgetter(*fieldnames), results))
                 
         logger.info(f"{ICONS['file']} 检查结果已保存到: {os.path.abspath(filename)}")
         
@@ -352,33 +648,19 @@ def check_url_list():
         logger.warning(f"{ICONS['warning']} 没有有效的URL可检查")
         return
     
-    logger.info(f"{ICONS['info']} 开始检查 {len(processed_urls)} 个有效URL (并发数: {workers}, 超时: {timeout}秒)")
+    # 安装了httpx和h2时用HTTP/2客户端，否则使用线程池
+    backend = "HTTP/2客户端(httpx)" if httpx is not None else "线程池(requests)"
+    logger.info(f"{ICONS['info']} 开始检查 {len(processed_urls)} 个有效URL (并发数: {workers}, 超时: {timeout}秒, 检查方式: {backend})")
     print("-" * 80)
     
-    # 使用线程池并发检查URL
-    results = []
-    with ThreadPoolExecutor(max_workers=workers) as executor:
-        # 提交所有任务
-        futures = {executor.submit(check_url, url, timeout): url for url in processed_urls}
-        
-        # 处理完成的任务
-        for future in as_completed(futures):
-            url = futures[future]
-            try:
-                result = future.result()
-                results.append(result)
-                
-                # 构建包含IP的状态信息
-                ip_info = f"[{ICONS['ip']} {result['ip_address']}]" if result['ip_address'] else "[IP: 未知]"
-                
-                if result['is_accessible']:
-                    logger.info(f"{ICONS['success']} {url} {ip_info} - 状态码: {result['status_code']}")
-                else:
-                    error_msg = f"状态码: {result['status_code']}" if result['status_code'] else result['error']
-                    logger.info(f"{ICONS['error']} {url} {ip_info} - {error_msg}")
-                    
-            except Exception as e:
-                logger.error(f"{ICONS['error']} 检查 {url} 时出错: {str(e)}")
+    # 先并发解析全部主机名，HTTP检查阶段直接查表，不再等待DNS
+    ip_map = preresolve_hostnames(processed_urls)
+    
+    # 并发检查URL
+    if httpx is not None:
+        results = asyncio.run(check_urls_http2(processed_urls, workers, timeout, ip_map))
+    else:
+        results = check_urls_threaded(processed_urls, workers, timeout, ip_map)
     
     # 保存结果到CSV
     save_results_to_csv(results, timestamp)
@@ -397,26 +679,38 @@ def check_url_list():
     print(f"{ICONS['error']} 访问失败: {len(failed)}")
     print("-" * 80)
 
+def list_result_files() -> List[tuple]:
+    """查找当前目录下的结果文件，返回[(文件名, stat结果)]
+    
+    scandir一次遍历，目录项自带的stat结果同时提供创建时间和大小，不再逐个文件调用getctime/getsize
+    """
+    result_files = []
+    with os.scandir('.') as entries:
+        for entry in entries:
+            if entry.name.startswith('urlcheck_') and entry.name.endswith('.csv') and entry.is_file():
+                result_files.append((entry.name, entry.stat()))
+    return result_files
+
 def view_history():
     """查看历史检查结果"""
     print(f"\n{ICONS['history']} 历史检查结果")
     print("-" * 50)
     
     # 查找所有结果文件
-    result_files = [f for f in os.listdir('.') if f.startswith('urlcheck_') and f.endswith('.csv')]
+    result_files = list_result_files()
     
     if not result_files:
         print(f"{ICONS['info']} 没有找到历史检查结果")
         return
     
     # 按创建时间排序
-    result_files.sort(key=lambda x: os.path.getctime(x), reverse=True)
+    result_files.sort(key=lambda item: item[1].st_ctime, reverse=True)
     
     # 显示最近的10个结果
     print(f"{ICONS['file']} 最近的检查结果:")
-    for i, filename in enumerate(result_files[:10], 1):
-        ctime = time.ctime(os.path.getctime(filename))
-        size = os.path.getsize(filename) / 1024
+    for i, (filename, st) in enumerate(result_files[:10], 1):
+        ctime = time.ctime(st.st_ctime)
+        size = st.st_size / 1024
         print(f"{i}. {filename} - 创建于: {ctime} - 大小: {size:.2f}KB")
     
     # 询问是否要打开某个文件
@@ -425,15 +719,20 @@ def view_history():
         if choice and choice != '0':
             index = int(choice) - 1
             if 0 <= index < len(result_files[:10]):
-                filename = result_files[index]
+                filename = result_files[index][0]
                 print(f"\n{ICONS['file']} 显示 {filename} 的前10行内容:")
                 print("-" * 80)
+                # 只读取文件开头一段再按行切分，不随文件大小增长
                 with open(filename, 'r', encoding='utf-8') as f:
-                    for i, line in enumerate(f):
-                        if i > 10:
-                            print("... (显示前10行)")
-                            break
-                        print(line.strip())
+                    head = f.read(HISTORY_PREVIEW_CHARS)
+                lines = head.splitlines()
+                truncated = len(head) == HISTORY_PREVIEW_CHARS
+                if truncated and len(lines) <= HISTORY_PREVIEW_LINES:
+                    lines.pop()  # 最后一行可能被截断
+                for line in lines[:HISTORY_PREVIEW_LINES]:
+                    print(line.strip())
+                if truncated or len(lines) > HISTORY_PREVIEW_LINES:
+                    print("... (显示前10行)")
                 print("-" * 80)
                 
                 # 询问是否用默认程序打开
@@ -556,13 +855,21 @@ URL可用性检查工具，支持批量检查URL是否可访问，
     print(version_text)
     print("-" * 50)
 
+def try_remove(filename: str) -> Optional[Exception]:
+    """删除文件，成功返回None，失败返回异常"""
+    try:
+        os.remove(filename)
+        return None
+    except Exception as e:
+        return e
+
 def clear_history():
     """清除历史结果文件"""
     print(f"\n{ICONS['clear']} 清除历史结果")
     print("-" * 50)
     
     # 查找所有结果文件
-    result_files = [f for f in os.listdir('.') if f.startswith('urlcheck_') and f.endswith('.csv')]
+    result_files = [filename for filename, _ in list_result_files()]
     
     if not result_files:
         print(f"{ICONS['info']} 没有找到历史检查结果")
@@ -577,18 +884,23 @@ def clear_history():
     confirm = input(f"\n确定要删除这些文件吗? (y/N): ").strip().lower()
     if confirm == 'y':
         deleted = 0
-        for filename in result_files:
-            try:
-                os.remove(filename)
-                deleted += 1
-            except Exception as e:
-                logger.error(f"{ICONS['error']} 删除 {filename} 失败: {str(e)}")
+        # 删除请求并发发出，文件较多或位于网络文件系统时不必逐个等待
+        with ThreadPoolExecutor(max_workers=min(DELETE_WORKERS, len(result_files))) as executor:
+            for filename, error in zip(result_files, executor.map(try_remove, result_files)):
+                if error is None:
+                    deleted += 1
+                else:
+                    logger.error(f"{ICONS['error']} 删除 {filename} 失败: {str(error)}")
         logger.info(f"{ICONS['success']} 成功删除 {deleted} 个文件")
     else:
         logger.info(f"{ICONS['info']} 已取消删除操作")
 
 def main():
     """主函数：交互式命令行入口"""
+    # Windows旧版控制台需先执行一次空命令才会启用ANSI转义序列
+    if sys.platform.startswith('win32'):
+        os.system('')
+    
     # 加载配置
     load_config()
     
@@ -638,11 +950,7 @@ def main():
         
         # 等待用户按回车继续
         input("\n按回车键返回主菜单...")
-        # 清屏（跨平台）
-        if sys.platform.startswith('win32'):
-            os.system('cls')
-        else:
-            os.system('clear')
+        clear_screen()
         print_title()
 
 if __name__ == "__main__":